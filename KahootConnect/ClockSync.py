@@ -0,0 +1,62 @@
+# KahootConnect/ClockSync.py
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+from .EventLog import EventLogger
+
+class ClockSync:
+    """Server clock offset and network lag estimated from Bayeux timesync replies.
+
+    Follows the CometD timesync extension: every message carries {tc, l, o}, and for a
+    reply {tc, ts, p} the one-way lag is (now - tc - p) / 2 and the offset ts - tc - lag.
+    Both are averaged over the last `window` samples. All values are in milliseconds.
+    """
+
+    def __init__(self, window: int = 10):
+        self.logger = logging.getLogger(__name__)
+        self.event_log = EventLogger(__name__)
+        self._samples = deque(maxlen=window)
+        self.offset = 0.0
+        self.lag = 0.0
+        self.round_trip = 0.0
+        self.sample_count = 0
+
+    @staticmethod
+    def local_time_ms() -> int:
+        """Local wall clock in milliseconds, the time base of `tc`"""
+        return int(time.time() * 1000)
+
+    def server_time_ms(self) -> float:
+        """Current server wall clock estimate in milliseconds"""
+        return time.time() * 1000 + self.offset
+
+    def timesync(self) -> Dict[str, int]:
+        """timesync extension for an outgoing message"""
+        return {"tc": self.local_time_ms(), "l": int(round(self.lag)), "o": int(round(self.offset))}
+
+    def handle_reply(self, timesync: Dict[str, Any], received_ms: Optional[float] = None) -> Optional[float]:
+        """Update the estimates from the timesync extension of a server reply, returns its round trip"""
+        try:
+            client_time = timesync["tc"]
+            server_time = timesync["ts"]
+            processing = timesync.get("p", 0)
+        except (KeyError, TypeError):
+            return None
+        if not client_time:
+            return None
+
+        now = received_ms if received_ms is not None else time.time() * 1000
+        round_trip = now - client_time - processing
+        if round_trip < 0:
+            return None
+
+        lag = round_trip / 2
+        self._samples.append((lag, server_time - client_time - lag))
+        self.lag = sum(sample[0] for sample in self._samples) / len(self._samples)
+        self.offset = sum(sample[1] for sample in self._samples) / len(self._samples)
+        self.round_trip = round_trip
+        self.sample_count += 1
+        self.event_log.debug("clock.sync", "Clock sync: offset=%.1fms lag=%.1fms rtt=%.1fms",
+                             self.offset, self.lag, round_trip)
+        return round_trip
@@ -0,0 +1,95 @@
+# KahootConnect/Codec/JsonCodec.py
+import json
+import logging
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+class JsonCodec:
+    """JSON encoder/decoder used on the whole wire path (stdlib implementation)"""
+    name = "json"
+
+    def dumps(self, obj: Any) -> str:
+        """Encode to a compact JSON string"""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode JSON text, raising ValueError on malformed input"""
+        return json.loads(data)
+
+class OrjsonCodec(JsonCodec):
+    """orjson backed codec"""
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def dumps(self, obj: Any) -> str:
+        return self._dumps(obj).decode('utf-8')
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        # orjson.JSONDecodeError is a ValueError subclass
+        return self._loads(data)
+
+class MsgspecCodec(JsonCodec):
+    """msgspec backed codec"""
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError("msgspec is not installed")
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode('utf-8')
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+CODECS = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "json": JsonCodec,
+}
+
+def available_codecs() -> list:
+    """Names of the codecs that can be used in this environment"""
+    names = []
+    for name, codec_class in CODECS.items():
+        try:
+            codec_class()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Return the named codec, or the fastest installed one (orjson, msgspec, then stdlib)"""
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        return CODECS[name]()
+
+    for codec_class in CODECS.values():
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+        logging.getLogger(__name__).debug(f"Using JSON codec: {codec.name}")
+        return codec
+    return JsonCodec()
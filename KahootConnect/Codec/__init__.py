@@ -0,0 +1,3 @@
+from .JsonCodec import JsonCodec, OrjsonCodec, MsgspecCodec, get_codec, available_codecs
+
+__all__ = ['JsonCodec', 'OrjsonCodec', 'MsgspecCodec', 'get_codec', 'available_codecs']
@@ -1,16 +1,34 @@
+from .Metrics.MetricsRegistry import ClientMetrics
+from .Protocol.KahootProtocol import KahootProtocol
+
+def _protocol_field(name: str, doc: str) -> property:
+    """A context attribute that is really state of the protocol"""
+    return property(lambda self: getattr(self.protocol, name),
+                    lambda self, value: setattr(self.protocol, name, value),
+                    doc=doc)
+
 class Context:
     def __init__(self):
         self.debug = False
-        self.game_pin = ""
-        self.client_id = ""
-        self.message_counter = 1
+        # Owns the protocol state the attributes below read and write
+        self.protocol = KahootProtocol()
         self.websocket_client = None
-        self.player_name = ""
         self.game_event_handler = None
-        self.ack_counter = 2
-        self.cid = 0
+        self.reconnect_handler = None
         self.score = 0
         self.rank = 0
+        self.metrics = ClientMetrics()
+        self.base_url = "https://kahoot.it"
+        self.websocket_url = "wss://kahoot.it"
+
+    game_pin = _protocol_field("game_pin", "Game PIN")
+    player_name = _protocol_field("player_name", "Nickname the player logs in with")
+    client_id = _protocol_field("client_id", "Bayeux client ID from the handshake")
+    cid = _protocol_field("cid", "Kahoot player ID from the login")
+    message_counter = _protocol_field("message_counter", "Id of the next outbound message")
+    ack_counter = _protocol_field("ack_counter", "ack of the next /meta/connect")
+    codec = _protocol_field("codec", "JSON codec of the wire path")
+    clock = _protocol_field("clock", "ClockSync estimates of the server clock")
 
 # singleton instance
 shared_context = Context()
\ No newline at end of file
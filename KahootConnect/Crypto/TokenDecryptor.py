@@ -1,81 +1,111 @@
 # KahootConnect/Crypto/TokenDecryptor.py
 import re
+import ast
 import base64
 import logging
+import operator
+import functools
 import urllib.parse
 
+_MESSAGE_RE = re.compile(r"decode\.call\(this,\s*'([^']+)'")
+_NUMBER_RE = re.compile(r'\b\d+\b')
+# Everything but digits, + and * is dropped from offset expressions before evaluating them
+_EXPRESSION_STRIP_RE = re.compile(r'[^0-9+*()]')
+
+# Offset forms seen in reserve challenges, tried in order; the last one takes any expression
+_OFFSET_PATTERNS = [
+    (
+        re.compile(r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\+\s*(\d+)\s*\+\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)\s*\+\s*(\d+)'),
+        lambda groups: ((int(groups[0]) + int(groups[1])) + int(groups[2]) + (int(groups[3]) + int(groups[4]))) + int(groups[5]),
+        '((a+b)+c+(d+e))+f'
+    ),
+    (
+        re.compile(r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\*\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)'),
+        lambda groups: (int(groups[0]) + int(groups[1])) * (int(groups[2]) + int(groups[3])),
+        '(a+b)*(c+d)'
+    ),
+    (
+        re.compile(r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\*\s*(\d+)\s*\*\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)'),
+        lambda groups: (int(groups[0]) + int(groups[1])) * int(groups[2]) * (int(groups[3]) + int(groups[4])),
+        '((a+b)*c*(d+e))'
+    ),
+    (
+        re.compile(r'offset\s*=\s*(\([^;]+);'),
+        lambda groups: evaluate_expression(groups[0]),
+        'arithmetic_expression'
+    ),
+]
+
+# Offset expressions are short; anything longer is not a challenge we understand
+MAX_EXPRESSION_LENGTH = 256
+
+_BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _evaluate_node(node) -> int:
+    if isinstance(node, ast.Expression):
+        return _evaluate_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand))
+    raise ValueError(f"Unsupported element in offset expression: {type(node).__name__}")
+
+@functools.lru_cache(maxsize=256)
+def evaluate_expression(expression: str) -> int:
+    """Evaluate an integer +, - and * expression without eval(); results are cached"""
+    expression = _EXPRESSION_STRIP_RE.sub('', expression)
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Offset expression too long ({len(expression)} characters)")
+    return _evaluate_node(ast.parse(expression, mode='eval'))
+
 class TokenDecryptor:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
     def get_message(self, challenge: str) -> str:
         """Extract message from challenge JavaScript"""
-        match = re.search(r"decode\.call\(this,\s*'([^']+)'", challenge)
+        match = _MESSAGE_RE.search(challenge)
         if match:
             return match.group(1)
-        self.logger.error("Message not found in challenge\nChallenge: {challenge}")
+        self.logger.error(f"Message not found in challenge\nChallenge: {challenge}")
         raise ValueError("Message not found in challenge")
 
     def get_offset(self, challenge: str) -> int:
         """Extract and calculate offset from challenge - handles multiple patterns"""
-        clean_challenge = re.sub(r'[ \s]+', ' ', challenge)
-        
-        patterns = [
-            {
-                'pattern': r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\+\s*(\d+)\s*\+\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)\s*\+\s*(\d+)',
-                'calculation': lambda groups: ((int(groups[0]) + int(groups[1])) + int(groups[2]) + (int(groups[3]) + int(groups[4]))) + int(groups[5]),
-                'name': '((a+b)+c+(d+e))+f'
-            },
-            {
-                'pattern': r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\*\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)',
-                'calculation': lambda groups: (int(groups[0]) + int(groups[1])) * (int(groups[2]) + int(groups[3])),
-                'name': '(a+b)*(c+d)'
-            },
-            {
-                'pattern': r'offset\s*=\s*\(\(\s*(\d+)\s*\+\s*(\d+)\s*\)\s*\*\s*(\d+)\s*\*\s*\(\s*(\d+)\s*\+\s*(\d+)\s*\)\)',
-                'calculation': lambda groups: (int(groups[0]) + int(groups[1])) * int(groups[2]) * (int(groups[3]) + int(groups[4])),
-                'name': '((a+b)*c*(d+e))'
-            },
-            {
-                'pattern': r'offset\s*=\s*(\([^;]+);',
-                'calculation': lambda groups: self._eval_expression(groups[0]),
-                'name': 'arithmetic_expression'
-            },
-        ]
-        
-        for pattern_info in patterns:
-            match = re.search(pattern_info['pattern'], clean_challenge)
+        for pattern, calculation, name in _OFFSET_PATTERNS:
+            match = pattern.search(challenge)
             if match:
-                self.logger.debug(f"Pattern matched: {pattern_info['name']}")
+                self.logger.debug(f"Pattern matched: {name}")
                 try:
-                    offset = pattern_info['calculation'](match.groups())
+                    offset = calculation(match.groups())
                     self.logger.debug(f"Calculated offset: {offset}")
                     return offset
                 except Exception as e:
-                    self.logger.error(f"Calculation failed for pattern {pattern_info['name']}: {e}")
+                    self.logger.error(f"Calculation failed for pattern {name}: {e}")
                     continue
-        
-        numbers = self._extract_all_numbers(clean_challenge)
+
+        numbers = self._extract_all_numbers(challenge)
         if numbers:
             self.logger.debug(f"Fallback: Found numbers: {numbers}")
             offset = self._guess_calculation(numbers)
             if offset is not None:
                 self.logger.debug(f"Guessed offset: {offset}")
                 return offset
-        
+
         self.logger.error(f"Could not find offset in challenge")
         raise ValueError("Offset not found in challenge")
 
     def _eval_expression(self, expression: str) -> int:
         """Evaluate arithmetic expression safely"""
-        expr_clean = re.sub(r'[^0-9+*()]', '', expression.strip())
-        self.logger.debug(f"Evaluating expression: {expr_clean}")
-        return eval(expr_clean)
+        self.logger.debug(f"Evaluating expression: {expression}")
+        return evaluate_expression(expression)
 
     def _extract_all_numbers(self, text: str) -> list:
         """Extract all numbers from text"""
-        numbers = re.findall(r'\b\d+\b', text)
-        return [int(n) for n in numbers]
+        return [int(n) for n in _NUMBER_RE.findall(text)]
 
     def _guess_calculation(self, numbers: list) -> int:
         """Try to guess the calculation from numbers"""
@@ -84,44 +114,49 @@ class TokenDecryptor:
                 return ((numbers[0] + numbers[1]) + numbers[2] + (numbers[3] + numbers[4])) + numbers[5]
             except:
                 pass
-        
+
         if len(numbers) >= 4:
             try:
                 return (numbers[0] + numbers[1]) * (numbers[2] + numbers[3])
             except:
                 pass
-        
+
         if len(numbers) >= 5:
             try:
                 return (numbers[0] + numbers[1]) * numbers[2] * (numbers[3] + numbers[4])
             except:
                 pass
-        
+
         if numbers:
             return sum(numbers)
-        
+
         return None
 
     def generate_key(self, message: str, offset: int) -> str:
         """Generate XOR key for decryption"""
-        key = ""
-        for position, char in enumerate(message):
-            key_char = chr((ord(char) * position + offset) % 77 + 48)
-            key += key_char
-        return key
+        if message.isascii():
+            # Byte values equal code points here, so the key is built as bytes in one pass
+            return bytes(
+                (code * position + offset) % 77 + 48 for position, code in enumerate(message.encode('ascii'))
+            ).decode('ascii')
+        return ''.join(chr((ord(char) * position + offset) % 77 + 48) for position, char in enumerate(message))
 
     def xor_decrypt(self, encrypted_token: str, key: str) -> str:
         """Perform XOR decryption"""
         try:
-            decoded_token = base64.b64decode(encrypted_token).decode('utf-8')
-            
-            result = ""
-            for i in range(len(decoded_token)):
-                char_code = ord(decoded_token[i])
-                key_code = ord(key[i % len(key)])
-                result += chr(char_code ^ key_code)
-            
-            return result
+            decoded = base64.b64decode(encrypted_token)
+            if decoded.isascii():
+                # Keys are ASCII (48..124), so the whole token is XORed as one big integer
+                length = len(decoded)
+                key_bytes = key.encode('ascii')
+                key_stream = (key_bytes * (length // len(key_bytes) + 1))[:length]
+                return (int.from_bytes(decoded, 'big') ^ int.from_bytes(key_stream, 'big')).to_bytes(length, 'big').decode('ascii')
+
+            # Non-ASCII tokens are XORed per code point of their UTF-8 text
+            decoded_token = decoded.decode('utf-8')
+            key_codes = [ord(char) for char in key]
+            key_length = len(key_codes)
+            return ''.join(chr(ord(char) ^ key_codes[i % key_length]) for i, char in enumerate(decoded_token))
         except Exception as e:
             self.logger.error(f"XOR decryption failed: {e}")
             raise
@@ -130,27 +165,27 @@ class TokenDecryptor:
         """Complete token decryption process"""
         try:
             self.logger.debug(f"Challenge preview: {challenge[:200]}...")
-            
+
             message = self.get_message(challenge)
             self.logger.debug(f"Extracted message: {message}")
-            
+
             offset = self.get_offset(challenge)
             self.logger.debug(f"Calculated offset: {offset}")
-            
+
             key = self.generate_key(message, offset)
             self.logger.debug(f"Generated key length: {len(key)}")
-            
+
             decrypted_token = self.xor_decrypt(encrypted_token, key)
             self.logger.debug(f"Raw decrypted token: {decrypted_token}")
-            
+
             # URL-encode the token to handle special characters
             url_safe_token = urllib.parse.quote(decrypted_token, safe='')
             self.logger.debug(f"URL-safe token: {url_safe_token}")
-            
+
             self.logger.info("Successfully decrypted session token")
-            
+
             return url_safe_token
-            
+
         except Exception as e:
             self.logger.error(f"Token decryption failed: {e}")
-            raise
\ No newline at end of file
+            raise
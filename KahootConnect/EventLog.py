@@ -0,0 +1,100 @@
+# KahootConnect/EventLog.py
+import json
+import logging
+from typing import Any, Dict, Optional
+
+# Package logger level and per event sampling of each profile
+LOG_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Production: warnings and errors only, nothing is formatted per packet
+    "quiet": {"level": logging.WARNING, "sample_every": {}},
+    # Question lifecycle, answers and connection changes
+    "default": {"level": logging.INFO, "sample_every": {}},
+    # Everything, with the per-packet, per-question dump and heartbeat events thinned out
+    "sampled": {"level": logging.DEBUG, "sample_every": {
+        "packet.received": 20, "packet.sent": 20, "packet.other": 20, "frame.raw": 20,
+        "player.content": 20, "block.dispatch": 20, "block.dump": 10,
+        "heartbeat.sent": 10, "heartbeat.reply": 10, "ack.updated": 10, "clock.sync": 10,
+    }},
+    "verbose": {"level": logging.DEBUG, "sample_every": {}},
+}
+
+# Event name -> keep one in every N, shared by every EventLogger
+_sample_every: Dict[str, int] = {}
+
+def set_sampling(event: str, every: Optional[int]) -> None:
+    """Log only one in every `every` occurrences of an event; None or 1 logs them all"""
+    if every is None or every <= 1:
+        _sample_every.pop(event, None)
+    else:
+        _sample_every[event] = every
+
+def set_log_profile(profile: str, logger_name: str = "KahootConnect") -> None:
+    """Apply one of LOG_PROFILES to the package loggers"""
+    try:
+        settings = LOG_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown log profile: {profile} (choose from {', '.join(LOG_PROFILES)})") from None
+    logging.getLogger(logger_name).setLevel(settings["level"])
+    _sample_every.clear()
+    _sample_every.update(settings["sample_every"])
+
+class EventLogger:
+    """Structured log events for the hot paths.
+
+    An event has a name, a %-style message and keyword fields. Nothing is formatted
+    unless the level is enabled: the message is only rendered by the handler, and the
+    fields travel unformatted on the record (`record.event`, `record.fields`) for
+    structured handlers such as JsonLogFormatter. Events can be sampled with
+    set_sampling() so that only one in N is logged. Pass plain values as fields and
+    arguments; building strings at the call site is the cost this class avoids.
+    """
+
+    __slots__ = ('logger', '_seen')
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+        self._seen: Dict[str, int] = {}
+
+    def enabled(self, level: int) -> bool:
+        """For call sites that would do extra work just to build the event"""
+        return self.logger.isEnabledFor(level)
+
+    def event(self, level: int, event: str, msg: str, *args, **fields) -> None:
+        logger = self.logger
+        if not logger.isEnabledFor(level):
+            return
+        every = _sample_every.get(event)
+        if every:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+            if seen % every:
+                return
+            fields["sampled"] = every
+        logger.log(level, msg, *args, extra={"event": event, "fields": fields})
+
+    def debug(self, event: str, msg: str, *args, **fields) -> None:
+        self.event(logging.DEBUG, event, msg, *args, **fields)
+
+    def info(self, event: str, msg: str, *args, **fields) -> None:
+        self.event(logging.INFO, event, msg, *args, **fields)
+
+    def warning(self, event: str, msg: str, *args, **fields) -> None:
+        self.event(logging.WARNING, event, msg, *args, **fields)
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event, message and the event fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry["fields"] = fields
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
@@ -1,144 +1,372 @@
 # KahootConnect/KahootClient.py
+import time
 import asyncio
 import logging
-import json
-from typing import Dict, Any, Callable
+from typing import AsyncIterator, Dict, Any, Callable, Optional
 
+from .Codec.JsonCodec import get_codec
 from .Crypto.TokenDecryptor import TokenDecryptor
 from .Networking.SessionManager import SessionManager
 from .Networking.WebSocketClient import WebSocketClient
+from .Networking.PacketRecorder import PacketRecorder
+from .Networking.DnsCache import DnsCache
+from .Metrics.MetricsRegistry import ClientMetrics
+from .Metrics.MetricsExporter import MetricsExporter
+from .Protocol.KahootProtocol import KahootProtocol
 from .Packets.Handlers.HandshakeHandler import HandshakeHandler
 from .Packets.Handlers.GameEventHandler import GameEventHandler
+from .Packets.Handlers.ReconnectHandler import ReconnectHandler
+from .Packets.Handlers.EventBus import Subscription
+from .Packets.Messages.ParsedMessage import ParsedMessage
 from .Context import shared_context
+from .EventLog import EventLogger, set_log_profile
 
 class KahootClient:
-    def __init__(self, game_pin: str, player_name: str, debug: bool = False):
+    def __init__(self, game_pin: str, player_name: str, debug: bool = False, max_queue_size: int = 256,
+                 json_codec: Optional[str] = None, packet_recorder: Optional[PacketRecorder] = None,
+                 record_session: Optional[str] = None, base_url: str = "https://kahoot.it",
+                 websocket_url: Optional[str] = None, max_handler_concurrency: int = 32,
+                 keep_full_blocks: Optional[int] = 32, block_spill_path: Optional[str] = None,
+                 auto_reconnect: bool = True, max_reconnect_attempts: int = 8,
+                 liveness_timeout: Optional[float] = 45.0, http2: bool = False, connect_timeout: float = 3.0,
+                 metrics_path: Optional[str] = None, metrics_interval: float = 10.0,
+                 metrics_format: str = "json", log_profile: Optional[str] = None):
         shared_context.debug = debug
-        shared_context.game_pin = game_pin
+        # "quiet" for production, see EventLog.LOG_PROFILES
+        if log_profile:
+            set_log_profile(log_profile)
+        # Point these at a StandInServer to run the whole join path offline
+        shared_context.base_url = base_url.rstrip("/")
+        shared_context.websocket_url = (websocket_url or shared_context.base_url.replace("http", "ws", 1)).rstrip("/")
+        # Protocol state of this player (client ID, acks, message ids, clock), I/O-free
+        self.protocol = shared_context.protocol = KahootProtocol(game_pin, player_name, get_codec(json_codec))
+        # Recorded by every component, read with stats() and metrics_text()
+        self.metrics = shared_context.metrics = ClientMetrics()
         self.player_name = player_name
-        shared_context.player_name = player_name
         
         # Initialize components
         self.token_decryptor = TokenDecryptor()
-        self.session_manager = SessionManager()
-        self.websocket_client = WebSocketClient()
+        # Host lookups are shared by the reserve requests and the WebSocket
+        self.dns_cache = DnsCache()
+        # One pooled HTTP client for every reserve request, see warm_up()
+        self.session_manager = SessionManager(http2=http2, dns_cache=self.dns_cache)
+        # Full session capture for SessionReplayer, in a single unrotated file
+        if record_session and packet_recorder is None:
+            packet_recorder = PacketRecorder(record_session, max_bytes=0)
+
+        # debug=True records to packet_log.txt unless a custom recorder is given
+        self.websocket_client = WebSocketClient(max_queue_size=max_queue_size, recorder=packet_recorder,
+                                                dns_cache=self.dns_cache, connect_timeout=connect_timeout)
         shared_context.websocket_client = self.websocket_client
         
         # Initialize handlers - pass websocket_client to GameEventHandler
         self.handshake_handler = HandshakeHandler()
-        self.game_event_handler = GameEventHandler()
+        # Blocks older than the last keep_full_blocks are compacted (and spilled, if a path is given)
+        self.game_event_handler = GameEventHandler(max_handler_concurrency=max_handler_concurrency,
+                                                   keep_full_blocks=keep_full_blocks,
+                                                   block_spill_path=block_spill_path)
         shared_context.game_event_handler = self.game_event_handler
+
+        # Recovers lost connections from the listen loop, see ReconnectHandler
+        self.reconnect_handler = ReconnectHandler(self.handshake_handler, self._open_connection,
+                                                  enabled=auto_reconnect,
+                                                  max_attempts=max_reconnect_attempts,
+                                                  liveness_timeout=liveness_timeout)
+        shared_context.reconnect_handler = self.reconnect_handler
         
+        self._register_gauges()
+        # Written to metrics_path every metrics_interval seconds while connected
+        self.metrics_exporter = None
+        if metrics_path:
+            self.metrics_exporter = MetricsExporter(self.metrics, metrics_path, metrics_interval,
+                                                    metrics_format, collect=self.stats)
+
         self.is_connected = False
+        # Per stage durations (ms) of the last connect, see _open_connection
+        self.connect_timings: Dict[str, float] = {}
         self.logger = logging.getLogger(__name__)
+        self.event_log = EventLogger(__name__)
+
+    async def warm_up(self) -> bool:
+        """Set up the HTTP client and its connection to Kahoot ahead of connect()"""
+        return await self.session_manager.warm_up()
 
     async def connect(self) -> bool:
         """Connect to Kahoot game"""
         try:
-            # Get session data
-            session_data = await self.session_manager.get_session()
-            
-            # Decrypt token
-            decrypted_token = self.token_decryptor.decrypt(
-                session_data['session_token'],
-                session_data['challenge']
-            )
-            
-            # Connect to WebSocket
-            ws_url = f"wss://kahoot.it/cometd/{shared_context.game_pin}/{decrypted_token}"
-            if not await self.websocket_client.connect(ws_url):
+            started = time.perf_counter()
+            if not await self._open_connection():
                 return False
             
             # Perform handshake
+            handshake_started = time.perf_counter()
             await self.handshake_handler.perform_handshake()
+            self.connect_timings["handshake_ms"] = (time.perf_counter() - handshake_started) * 1000
+            for state, duration in self.handshake_handler.state_timings.items():
+                self.connect_timings[f"join.{state}_ms"] = duration
+            self.connect_timings["total_ms"] = (time.perf_counter() - started) * 1000
             
             self.is_connected = True
+            self.reconnect_handler.start()
+            if self.metrics_exporter:
+                self.metrics_exporter.start()
             self.logger.info("Successfully connected to Kahoot game")
+            self.logger.info("⏱️ Connect timings: " + ", ".join(
+                f"{stage} {duration:.1f}" for stage, duration in self.connect_timings.items()
+            ))
             return True
             
         except Exception as e:
             self.logger.error(f"Connection failed: {e}")
             return False
 
+    async def _open_connection(self) -> bool:
+        """Reserve a session, decrypt its token and open the WebSocket for it.
+
+        The WebSocket host is resolved and its TCP connection opened while the reserve
+        request is in flight; only the TLS and WebSocket handshakes wait for the token.
+        """
+        timings = self.connect_timings = {}
+        started = time.perf_counter()
+
+        async def reserve() -> str:
+            # Get session data
+            session_data = await self.session_manager.get_session()
+            timings["reserve_ms"] = (time.perf_counter() - started) * 1000
+
+            # Decrypt token
+            decrypt_started = time.perf_counter()
+            decrypted_token = self.token_decryptor.decrypt(
+                session_data['session_token'],
+                session_data['challenge']
+            )
+            timings["decrypt_ms"] = (time.perf_counter() - decrypt_started) * 1000
+            return decrypted_token
+
+        async def open_socket():
+            sock = await self.websocket_client.open_socket(shared_context.websocket_url)
+            timings["tcp_connect_ms"] = (time.perf_counter() - started) * 1000
+            return sock
+
+        socket_task = asyncio.ensure_future(open_socket())
+        try:
+            decrypted_token = await reserve()
+        except BaseException:
+            # No token, no use for the socket: stop connecting instead of waiting for it
+            socket_task.cancel()
+            try:
+                sock = await socket_task
+            except BaseException:
+                pass
+            else:
+                sock.close()
+            raise
+        try:
+            sock = await socket_task
+        except Exception as e:
+            # Not fatal, websockets opens its own connection
+            self.logger.debug(f"Early WebSocket connect failed: {e!r}")
+            sock = None
+        timings["overlapped_ms"] = min(timings.get("reserve_ms", 0.0) + timings.get("decrypt_ms", 0.0),
+                                       timings.get("tcp_connect_ms", 0.0))
+
+        # Connect to WebSocket
+        websocket_started = time.perf_counter()
+        ws_url = f"{shared_context.websocket_url}/cometd/{shared_context.game_pin}/{decrypted_token}"
+        connected = await self.websocket_client.connect(ws_url, sock=sock)
+        timings["websocket_ms"] = (time.perf_counter() - websocket_started) * 1000
+        return connected
+
+    @property
+    def player_data(self) -> Optional[Dict[str, Any]]:
+        """Content of the player data message of the join (data.id 14), if it arrived"""
+        return self.handshake_handler.player_data
+
+    @property
+    def game_data(self) -> Optional[Dict[str, Any]]:
+        """Content of the game data message (data.id 9), if it arrived"""
+        return self.handshake_handler.game_data
+
+    async def reconnect(self) -> bool:
+        """Re-establish the connection now, resuming the session where the server allows it"""
+        if not self.is_connected:
+            return False
+        # The listen loop sees the dropped socket and waits for this recovery
+        self.websocket_client.abort()
+        await self.websocket_client.close()
+        return await self.reconnect_handler.reconnect()
+
+    async def _recover_connection(self) -> bool:
+        """Called when the message stream ended; True if it was brought back"""
+        if not self.is_connected or not self.reconnect_handler.enabled:
+            return False
+        return await self.reconnect_handler.reconnect()
+
+    async def messages(self) -> AsyncIterator[ParsedMessage]:
+        """Yield raw received messages without dispatching them to the game handlers.
+
+        The reader stops pulling from the socket while `max_queue_size` frames are
+        waiting, so a slow consumer applies backpressure instead of growing memory.
+        """
+        while True:
+            for packet in self.handshake_handler.take_pending_packets():
+                yield packet
+            if self.reconnect_handler.pending_answers:
+                # What the server redelivered may end the questions the answers were for
+                for packet in self.websocket_client.buffered_packets():
+                    yield packet
+                await self.reconnect_handler.replay_answers()
+            async for packet in self.websocket_client.messages():
+                yield packet
+
+            # The stream ended: reconnect unless we disconnected on purpose
+            if not await self._recover_connection():
+                return
+
+    async def events(self) -> AsyncIterator[ParsedMessage]:
+        """Dispatch received messages to the game handlers and yield each one afterwards"""
+        packet_count = 0
+        async for packet in self.messages():
+            if not self.is_connected:
+                break
+            packet_count += 1
+            await self._process_packet(packet, packet_count)
+            yield packet
+
     async def listen(self) -> None:
-        """Listen for incoming messages with responsive timing"""
+        """Dispatch incoming messages until the connection closes"""
         self.logger.info("Starting to listen for packets...")
         packet_count = 0
-        
-        while self.is_connected and self.websocket_client.is_connected:
-            try:
-                self.logger.info("Waiting for next packet...")
-                packet = await self.websocket_client.receive_packet()
-                self.logger.info("Packet received.")
+
+        try:
+            async for _ in self.events():
                 packet_count += 1
-                
-                # Handle timeout case (no data received)
-                if packet is None:
-                    continue
-                    
-                # Handle empty dict case
-                if packet == {}:
-                    continue
-                
-                # Debug
-                channel = packet.get('channel', '')
-                self.logger.debug(f"📦 Packet #{packet_count} on channel: {channel}")
-                
-                # CRITICAL: Process heartbeat packets immediately
-                if channel == '/meta/connect':
-                    self.logger.debug("💓 Heartbeat packet received - processing immediately")
-                    await self.game_event_handler.handle_packet(packet)
-                    continue
-                    
-                if channel == '/service/player':
-                    data = packet.get('data', {})
-                    content_str = data.get('content', '{}')
-                    
-                    if content_str is None or content_str == 'null':
-                        self.logger.info("🎯 SERVICE/PLAYER PACKET: No content (null)")
-                        # Still pass the packet to the handler, it might handle null content
-                        await self.game_event_handler.handle_packet(packet)
-                        continue
-
-                    # Log the raw content to see what's actually there
-                    self.logger.info(f"🎯 SERVICE/PLAYER PACKET: {content_str[:200]}...")
-                    
-                    try:
-                        content = json.loads(content_str)
-                        event_type = content.get('type')
-                        game_block = content.get('gameBlockIndex')
-                        
-                        self.logger.info(f"🔍 Parsed: type={event_type}n, block={game_block}")
-                        
-                    except Exception as e:
-                        self.logger.warning(f"❌ Failed to parse content: {e}")
-                        self.logger.debug(f"Raw content: {content_str}")
-                        
-                else:
-                    self.logger.debug(f"📡 Other channel: {channel}")
-                        
-                await self.game_event_handler.handle_packet(packet)
-                
-            except Exception as e:
-                self.logger.error(f"Error in listen loop: {e}")
-                self.logger.debug("Full error:", exc_info=True)
-                break
+        except Exception as e:
+            self.logger.error(f"Error in listen loop: {e}")
+            self.logger.debug("Full error:", exc_info=True)
 
         self.logger.info(f"Listen loop ended after {packet_count} packets")
         self.is_connected = False
 
+    async def _process_packet(self, packet: ParsedMessage, packet_count: int) -> None:
+        """Log and dispatch a single received message"""
+        # Handle empty message case
+        if not packet.packet:
+            return
+        
+        channel = packet.channel
+        self.event_log.debug("packet.received", "📦 Packet #%d on channel: %s", packet_count, channel,
+                             channel=channel, number=packet_count)
+        
+        # CRITICAL: Process heartbeat packets immediately
+        if channel == '/meta/connect':
+            await self.game_event_handler.handle_packet(packet)
+            return
+
+        # Status, player data and game data (sent once the host starts, usually after the
+        # join is done) are kept with the join messages; they are not game blocks
+        if self.handshake_handler.observe_join_packet(packet):
+            return
+
+        if channel == '/service/player':
+            content_str = packet.raw_content
+            
+            if content_str is None or content_str == 'null':
+                self.event_log.debug("player.content", "🎯 SERVICE/PLAYER PACKET: No content (null)")
+                # Still pass the packet to the handler, it might handle null content
+                await self.game_event_handler.handle_packet(packet)
+                return
+
+            # Decoded once here and reused by the handlers
+            content = packet.content
+            if packet.content_error is None and isinstance(content, dict):
+                # %.200s: the content is only cut (and formatted) when DEBUG is on
+                self.event_log.debug("player.content", "🎯 SERVICE/PLAYER PACKET: %.200s...", content_str,
+                                     type=content.get('type'), block=content.get('gameBlockIndex'))
+            else:
+                self.logger.warning("❌ Failed to parse content: %s", packet.content_error)
+                self.logger.debug("Raw content: %s", content_str)
+                
+        await self.game_event_handler.handle_packet(packet)
+
     async def disconnect(self) -> None:
         """Disconnect from game"""
         self.is_connected = False
+        await self.reconnect_handler.stop()
+        if self.metrics_exporter:
+            await self.metrics_exporter.stop()
         await self.websocket_client.disconnect()
+        await self.session_manager.close()
+        await self.game_event_handler.executor.shutdown()
+        self.game_event_handler.gameBlocks.close()
         self.logger.info("Disconnected from Kahoot game")
 
+    def _register_gauges(self) -> None:
+        """Expose the state and totals the components keep themselves through the registry"""
+        metrics = self.metrics
+        heartbeat = self.websocket_client.heartbeat.stats
+        reconnect = self.reconnect_handler
+        metrics.gauge("send_queue_depth", "Messages waiting in the send queue",
+                      lambda: self.websocket_client.send_queue.depth)
+        metrics.gauge("handlers_running", "Event handler tasks running",
+                      lambda: self.game_event_handler.executor.running)
+        metrics.gauge("heartbeats_missed_total", "Heartbeats left unanswered past the advised timeout",
+                      lambda: heartbeat.missed, kind="counter")
+        metrics.gauge("heartbeats_late_total", "Heartbeats sent late",
+                      lambda: heartbeat.late, kind="counter")
+        metrics.gauge("pending_answers", "Answers queued for replay after a reconnect",
+                      lambda: len(reconnect.pending_answers))
+        metrics.gauge("clock_offset_ms", "Estimated server clock offset", lambda: shared_context.clock.offset)
+        metrics.gauge("clock_lag_ms", "Estimated one-way network lag", lambda: shared_context.clock.lag)
+
+    def stats(self) -> Dict[str, Any]:
+        """Every metric and component report of the client, durations in milliseconds"""
+        return {
+            "metrics": self.metrics.snapshot(),
+            "connect": dict(self.connect_timings),
+            "handlers": self.handler_stats(),
+            "heartbeat": self.heartbeat_stats(),
+            "send_queue": self.send_queue_stats(),
+            "reconnect": self.reconnect_stats(),
+        }
+
+    def metrics_text(self) -> str:
+        """The metrics in the Prometheus text format, to serve from a /metrics endpoint"""
+        return self.metrics.to_prometheus()
+
+    def handler_stats(self) -> Dict[str, Any]:
+        """Per-handler call counts, failures, timeouts, cancellations and timings"""
+        return self.game_event_handler.executor.report()
+
+    def heartbeat_stats(self) -> Dict[str, Any]:
+        """Heartbeats sent, replies, coalesced acks and missed or late heartbeats"""
+        return self.websocket_client.heartbeat.report()
+
+    def send_queue_stats(self) -> Dict[str, Any]:
+        """Send queue depth, coalesced frames and per-priority wait times"""
+        return self.websocket_client.send_queue.report()
+
+    def reconnect_stats(self) -> Dict[str, Any]:
+        """Reconnect counts, queued answers and time-to-recover"""
+        return self.reconnect_handler.report()
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate memory held by the game blocks, full and compacted"""
+        return self.game_event_handler.gameBlocks.memory_report()
+
     # Event handler proxy methods
-    def on_gameBlockUpdate(self, handler: Callable):
-        self.game_event_handler.on_gameBlockUpdate(handler)
+    # Every event accepts any number of handlers, see EventBus.subscribe for the filters
+    def subscribe(self, event_name: str, handler: Callable, **filters) -> Subscription:
+        return self.game_event_handler.subscribe(event_name, handler, **filters)
+
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        return self.game_event_handler.unsubscribe(subscription)
+
+    def on_gameBlockUpdate(self, handler: Callable, **filters) -> Subscription:
+        return self.game_event_handler.on_gameBlockUpdate(handler, **filters)
 
-    def on_leaderboard(self, handler: Callable):
-        self.game_event_handler.on_leaderboard(handler)
+    def on_leaderboard(self, handler: Callable, **filters) -> Subscription:
+        return self.game_event_handler.on_leaderboard(handler, **filters)
 
-    def on_gameOver(self, handler: Callable):
-        self.game_event_handler.on_gameOver(handler)
\ No newline at end of file
+    def on_gameOver(self, handler: Callable, **filters) -> Subscription:
+        return self.game_event_handler.on_gameOver(handler, **filters)
\ No newline at end of file
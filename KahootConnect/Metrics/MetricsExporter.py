@@ -0,0 +1,79 @@
+# KahootConnect/Metrics/MetricsExporter.py
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+from .MetricsRegistry import MetricsRegistry
+
+class MetricsExporter:
+    """Writes the metrics to a local file every `interval` seconds.
+
+    With format "json" the file holds `collect()` (KahootClient.stats() by default, with a
+    timestamp added); with "prometheus" it holds the registry as Prometheus text, ready
+    for the node_exporter textfile collector. Each write goes to a temporary file that
+    then replaces the target, so readers never see a partial file, and the write runs
+    in a worker thread instead of on the event loop.
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 path: str,
+                 interval: float = 10.0,
+                 format: str = "json",
+                 collect: Optional[Callable[[], Dict[str, Any]]] = None):
+        if format not in ("json", "prometheus"):
+            raise ValueError(f"Unknown metrics format: {format}")
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.format = format
+        self.collect = collect or registry.snapshot
+        self.logger = logging.getLogger(__name__)
+        self.writes = 0
+        self._task = None
+
+    def render(self) -> str:
+        if self.format == "prometheus":
+            return self.registry.to_prometheus()
+        stats = self.collect()
+        stats["timestamp"] = time.time()
+        return json.dumps(stats, indent=2, default=str)
+
+    def _write(self, text: str) -> None:
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(text)
+        os.replace(temporary_path, self.path)
+
+    async def export(self) -> None:
+        """Write the metrics file now"""
+        # Rendered on the loop, where the metrics are updated, and written off it
+        text = self.render()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, text)
+        except OSError as e:
+            self.logger.warning(f"Could not write metrics to {self.path}: {e}")
+            return
+        self.writes += 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop exporting, after a last write so the file ends with the final values"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.export()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.export()
@@ -0,0 +1,194 @@
+# KahootConnect/Metrics/MetricsRegistry.py
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Upper bounds in seconds; one more bucket past the last counts everything larger (+Inf)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# For work done on the event loop per frame, microseconds to milliseconds
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+class Counter:
+    """Monotonic count, optionally split by the value of one label"""
+
+    __slots__ = ('name', 'help', 'label', 'values')
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        # Label value -> count; "" when the counter has no label
+        self.values: Dict[str, float] = {}
+
+    def inc(self, amount: float = 1, label_value: str = "") -> None:
+        values = self.values
+        values[label_value] = values.get(label_value, 0) + amount
+
+    @property
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def snapshot(self) -> Any:
+        if self.label is None:
+            return self.values.get("", 0)
+        return dict(self.values)
+
+class Histogram:
+    """Counts of observations in fixed buckets, plus their sum and maximum.
+
+    An observation is one bisect over the bucket bounds and a few additions, and the
+    memory used never grows. Quantiles are estimated as the upper bound of the bucket
+    the quantile falls in, so they are only as fine as the buckets.
+    """
+
+    __slots__ = ('name', 'help', 'buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Past the last bound only the maximum is known
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary in milliseconds, the unit every other report of the client uses"""
+        return {
+            "count": self.count,
+            "avg_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p90_ms": self.quantile(0.9) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+class Gauge:
+    """A value read from its owner when the registry is collected"""
+
+    __slots__ = ('name', 'help', 'read', 'kind')
+
+    def __init__(self, name: str, help: str, read: Callable[[], float], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        # "counter" for totals kept elsewhere, such as HeartbeatStats
+        self.kind = kind
+
+    def snapshot(self) -> float:
+        return self.read()
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MetricsRegistry:
+    """Named counters, histograms and gauges, readable as a dict or Prometheus text"""
+
+    def __init__(self, prefix: str = "kahoot_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+
+    def _add(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        return self._add(Counter(name, help, label))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float], kind: str = "gauge") -> Gauge:
+        """Register a value read on collection; replaces an earlier gauge of the same name"""
+        gauge = Gauge(name, help, read, kind)
+        self._metrics[name] = gauge
+        return gauge
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def to_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            full_name = self.prefix + name
+            lines.append(f"# HELP {full_name} {metric.help}")
+
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {full_name} counter")
+                if metric.label is None:
+                    lines.append(f"{full_name} {_format_value(metric.values.get('', 0))}")
+                else:
+                    for label_value, value in metric.values.items():
+                        lines.append(f'{full_name}{{{metric.label}="{_escape_label(label_value)}"}} {_format_value(value)}')
+
+            elif isinstance(metric, Histogram):
+                lines.append(f"# TYPE {full_name} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (math.inf,), metric.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{full_name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+                lines.append(f"{full_name}_sum {_format_value(metric.sum)}")
+                lines.append(f"{full_name}_count {metric.count}")
+
+            else:
+                lines.append(f"# TYPE {full_name} {metric.kind}")
+                lines.append(f"{full_name} {_format_value(metric.read())}")
+
+        return "\n".join(lines) + "\n"
+
+class ClientMetrics(MetricsRegistry):
+    """The metrics every KahootClient records, as attributes for the hot paths.
+
+    Durations are observed in seconds (as Prometheus expects) and reported in
+    milliseconds by snapshot().
+    """
+
+    def __init__(self, prefix: str = "kahoot_"):
+        super().__init__(prefix)
+        self.packets_received = self.counter("packets_received_total", "Messages received, by channel", "channel")
+        self.packets_sent = self.counter("packets_sent_total", "Messages sent, by channel", "channel")
+        self.bytes_received = self.counter("bytes_received_total", "Size of the received WebSocket frames")
+        self.bytes_sent = self.counter("bytes_sent_total", "Size of the sent WebSocket frames")
+        self.parse_time = self.histogram("frame_parse_seconds", "Time to decode a received frame", FAST_BUCKETS)
+        self.dispatch_latency = self.histogram(
+            "dispatch_latency_seconds", "From receiving a game event to dispatching it to the handlers")
+        self.answer_latency = self.histogram(
+            "answer_send_seconds", "From answer() (or the start of a staged question) to the answer being written")
+        self.heartbeat_rtt = self.histogram(
+            "heartbeat_rtt_seconds", "Network round trip of /meta/connect, server hold time excluded")
+        self.reconnects = self.counter("reconnects_total", "Connection recoveries, by outcome", "outcome")
+        self.handler_failures = self.counter(
+            "handler_failures_total", "Event handlers that raised or overran their deadline, by handler", "handler")
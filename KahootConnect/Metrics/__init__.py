@@ -0,0 +1,4 @@
+from .MetricsRegistry import MetricsRegistry, ClientMetrics, Counter, Histogram, Gauge, LATENCY_BUCKETS, FAST_BUCKETS
+from .MetricsExporter import MetricsExporter
+
+__all__ = ['MetricsRegistry', 'ClientMetrics', 'Counter', 'Histogram', 'Gauge', 'LATENCY_BUCKETS', 'FAST_BUCKETS', 'MetricsExporter']
@@ -0,0 +1,71 @@
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+from typing import Dict, List, Tuple
+
+def _interleave(addresses: List[str]) -> List[str]:
+    """Alternate address families (RFC 8305), so one broken family costs one attempt"""
+    by_family: Dict[int, List[str]] = {}
+    for address in addresses:
+        by_family.setdefault(ipaddress.ip_address(address).version, []).append(address)
+    families = list(by_family.values())
+    ordered = []
+    for index in range(max(map(len, families), default=0)):
+        ordered.extend(family[index] for family in families if index < len(family))
+    return ordered
+
+class DnsCache:
+    """Caches host name lookups for `ttl` seconds, so repeated joins skip DNS.
+
+    Every address of a host is kept, in the order connections should try them;
+    demote() moves one that failed to the back so the next connect starts elsewhere.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+        self._entries: Dict[Tuple[str, int], Tuple[List[str], float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve_all(self, host: str, port: int) -> List[str]:
+        """Return every address of host in connection order, from the cache while it is fresh"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        key = (host, port)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            return list(entry[0])
+
+        self.misses += 1
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = _interleave(list(dict.fromkeys(info[4][0] for info in infos)))
+        if not addresses:
+            raise OSError(f"No address found for {host}")
+        self._entries[key] = (addresses, now + self.ttl)
+        self.logger.debug(f"Resolved {host} to {', '.join(addresses)}")
+        return list(addresses)
+
+    async def resolve(self, host: str, port: int) -> str:
+        """Return the first address to try for host"""
+        return (await self.resolve_all(host, port))[0]
+
+    def demote(self, host: str, address: str) -> None:
+        """Try an address that failed to connect last, after the other addresses of host"""
+        for (entry_host, _), (addresses, _) in self._entries.items():
+            if entry_host == host and address in addresses:
+                addresses.remove(address)
+                addresses.append(address)
+
+    def invalidate(self, host: str) -> None:
+        """Forget the addresses of host, e.g. after connecting to every one of them failed"""
+        for key in [key for key in self._entries if key[0] == host]:
+            del self._entries[key]
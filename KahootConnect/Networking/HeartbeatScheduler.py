@@ -0,0 +1,176 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from ..Context import shared_context
+from ..EventLog import EventLogger
+from ..Packets.Messages.PacketFactory import PacketFactory
+
+class HeartbeatStats:
+    """Counts and delays of the /meta/connect heartbeats of a connection"""
+
+    __slots__ = ('sent', 'replies', 'coalesced', 'keepalives', 'missed', 'late',
+                 'total_send_delay', 'max_send_delay')
+
+    def __init__(self):
+        self.sent = 0
+        self.replies = 0
+        self.coalesced = 0
+        self.keepalives = 0
+        self.missed = 0
+        self.late = 0
+        self.total_send_delay = 0.0
+        self.max_send_delay = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        polls = self.sent - self.keepalives
+        return {
+            "sent": self.sent,
+            "replies": self.replies,
+            "coalesced": self.coalesced,
+            "keepalives": self.keepalives,
+            "missed": self.missed,
+            "late": self.late,
+            "avg_send_delay_ms": self.total_send_delay / polls * 1000 if polls > 0 else 0.0,
+            "max_send_delay_ms": self.max_send_delay * 1000,
+        }
+
+class HeartbeatScheduler:
+    """Sends every /meta/connect of an established session, following the server advice.
+
+    Each connect reply schedules the next connect `advice.interval` after it, carrying the
+    latest ack; replies that arrive before it went out are coalesced into that one send.
+    A connect the server leaves unanswered past `advice.timeout` plus `grace` counts as
+    missed and is re-sent. With no connect in flight, one is sent once nothing at all was
+    sent for `advice.timeout`, so any other outbound traffic resets that timer.
+    Connect replies are fed in by the WebSocket reader, so a busy event loop consumer does
+    not delay them.
+    """
+
+    def __init__(self, grace: float = 5.0, late_threshold: float = 0.25):
+        self.logger = logging.getLogger(__name__)
+        self.event_log = EventLogger(__name__)
+        # Server advice, in seconds
+        self.timeout = 30.0
+        self.interval = 0.0
+        self.grace = grace
+        # A connect sent this long after it was due counts as late
+        self.late_threshold = late_threshold
+        self.stats = HeartbeatStats()
+        self._task = None
+        self._wakeup = None
+        # time.monotonic() stamps
+        self._due_at = 0.0
+        self._outstanding_since = 0.0
+        self._last_sent = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def apply_advice(self, advice: Optional[Dict[str, Any]]) -> None:
+        if not advice:
+            return
+        if isinstance(advice.get("timeout"), (int, float)) and advice["timeout"] > 0:
+            self.timeout = advice["timeout"] / 1000
+        if isinstance(advice.get("interval"), (int, float)) and advice["interval"] >= 0:
+            self.interval = advice["interval"] / 1000
+
+    def note_sent(self, connect: bool = False) -> None:
+        """Called by WebSocketClient for every frame it sends"""
+        now = time.monotonic()
+        self._last_sent = now
+        if connect:
+            self._outstanding_since = now
+            self._due_at = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def on_connect_reply(self, packet: Dict[str, Any]) -> None:
+        """Called by WebSocketClient for every /meta/connect reply it receives"""
+        self.apply_advice(packet.get("advice"))
+        self._outstanding_since = 0.0
+        if not packet.get("successful", True):
+            self.logger.warning(f"💔 Heartbeat rejected: {packet.get('error')}")
+            if (packet.get("advice") or {}).get("reconnect") == "handshake" and self.running:
+                # The server dropped the session, let the reconnect logic take over
+                shared_context.websocket_client.abort()
+            return
+
+        self.stats.replies += 1
+        if self._due_at:
+            self.stats.coalesced += 1
+        else:
+            self._due_at = time.monotonic() + self.interval
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Take over the heartbeats once the handshake is done"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            if self._due_at:
+                if now >= self._due_at:
+                    await self._send_connect(now - self._due_at)
+                    continue
+                deadline = self._due_at
+            elif self._outstanding_since:
+                deadline = self._outstanding_since + self.timeout + self.grace
+            else:
+                deadline = self._last_sent + self.timeout
+
+            if deadline > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), deadline - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if self._outstanding_since:
+                self.stats.missed += 1
+                self.logger.warning(f"💔 No heartbeat reply for {now - self._outstanding_since:.1f}s, polling again")
+            else:
+                self.stats.keepalives += 1
+            await self._send_connect(None)
+
+    async def _send_connect(self, delay: Optional[float]) -> None:
+        self._due_at = 0.0
+        websocket_client = shared_context.websocket_client
+        try:
+            # Built at send time, so it carries the newest ack
+            await websocket_client.send_packet(PacketFactory.create_acknowledgement())
+        except ConnectionError as e:
+            self.logger.debug(f"Heartbeat not sent: {e}")
+            # The reader notices the closed connection, wait for the next event
+            self._outstanding_since = time.monotonic()
+            return
+
+        self.stats.sent += 1
+        if delay is not None:
+            self.stats.total_send_delay += delay
+            self.stats.max_send_delay = max(self.stats.max_send_delay, delay)
+            if delay > self.late_threshold:
+                self.stats.late += 1
+        self.event_log.debug("heartbeat.sent", "💓 Sent heartbeat with ack: %s", shared_context.ack_counter)
+
+    def report(self) -> Dict[str, Any]:
+        report = self.stats.as_dict()
+        report["timeout_ms"] = self.timeout * 1000
+        report["interval_ms"] = self.interval * 1000
+        return report
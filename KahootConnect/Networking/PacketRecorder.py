@@ -0,0 +1,138 @@
+# KahootConnect/Networking/PacketRecorder.py
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+class PacketRecorder:
+    """Buffered packet log written from a background thread.
+
+    Each line is `<wall time> <monotonic time> <direction> <raw frame>`, where direction
+    is "in" or "out" and the frame is the exact text sent or received on the socket.
+    """
+
+    def __init__(self,
+                 path: str = "packet_log.txt",
+                 flush_interval: float = 0.5,
+                 max_bytes: int = 10 * 1024 * 1024,
+                 rotate_interval: Optional[float] = None,
+                 backup_count: int = 3,
+                 max_buffer: int = 100000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.logger = logging.getLogger(__name__)
+
+        # deque appends are atomic, so record() never takes a lock
+        self._buffer = deque(maxlen=max_buffer)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._file = None
+        self._opened_at = 0.0
+        self.recorded = 0
+        self.written = 0
+        # Entries lost because the buffer overflowed before a flush
+        self.dropped = 0
+        # Flushes that failed on an OS error (full disk, failed rotation), their entries are lost
+        self.write_errors = 0
+
+    def start(self) -> None:
+        """Start the background writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="PacketRecorder", daemon=True)
+        self._thread.start()
+
+    def record(self, direction: str, frame) -> None:
+        """Queue a frame for writing; called on the event loop and never blocks on I/O"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((time.time(), time.monotonic(), direction, frame))
+        self.recorded += 1
+
+    def stop(self) -> None:
+        """Flush everything still buffered and stop the writer thread"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                try:
+                    self._flush()
+                except OSError as e:
+                    self.write_errors += 1
+                    self.logger.error(f"Packet recorder failed to write ({self.write_errors} failed flushes): {e}")
+                    # Reopened by the next flush, the rotation may have left it closed
+                    self._close_file()
+                if self._stopping:
+                    break
+        except Exception as e:
+            self.logger.error(f"Packet recorder failed: {e}")
+        finally:
+            self._close_file()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        lines = []
+        while True:
+            try:
+                wall, monotonic, direction, frame = self._buffer.popleft()
+            except IndexError:
+                break
+            if isinstance(frame, bytes):
+                frame = frame.decode('utf-8', errors='replace')
+            lines.append(f"{wall:.6f} {monotonic:.6f} {direction} {frame}\n")
+
+        self._rotate_if_needed()
+        self._file.write(''.join(lines))
+        self._file.flush()
+        self.written += len(lines)
+
+    def _rotate_if_needed(self) -> None:
+        if self._file is None:
+            self._open()
+            return
+
+        too_big = self.max_bytes and self._file.tell() >= self.max_bytes
+        too_old = self.rotate_interval and time.monotonic() - self._opened_at >= self.rotate_interval
+        if too_big or too_old:
+            self._file.close()
+            self._shift_backups()
+            self._open()
+
+    def _shift_backups(self) -> None:
+        """Rename packet_log.txt -> packet_log.txt.1 -> .2 ..., dropping the oldest"""
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _close_file(self) -> None:
+        if self._file:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
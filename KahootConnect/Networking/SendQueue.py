@@ -0,0 +1,167 @@
+import time
+import heapq
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Lower goes first
+PRIORITY_ANSWER = 0
+PRIORITY_CONTROL = 1
+PRIORITY_HEARTBEAT = 2
+
+_PRIORITY_NAMES = {PRIORITY_ANSWER: "answer", PRIORITY_CONTROL: "control", PRIORITY_HEARTBEAT: "heartbeat"}
+
+class _WaitStats:
+    __slots__ = ('messages', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.messages = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def add(self, wait: float) -> None:
+        self.messages += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "avg_wait_ms": self.total_wait / self.messages * 1000 if self.messages else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+class SendQueue:
+    """Single writer for a WebSocket, fed by a priority queue.
+
+    Messages are already encoded Bayeux messages (one JSON object each). Answers go out
+    before control messages, and those before heartbeats; within a priority they keep
+    their order. Answers always get a frame of their own, while queued control messages
+    and heartbeats are coalesced into one array frame of up to `max_batch` messages and
+    `max_frame_bytes`. When nothing is queued or being written, the caller writes its
+    frame itself instead of handing it to the writer task.
+    """
+
+    def __init__(self, write_frame: Callable[[str, bool], Awaitable[None]],
+                 max_batch: int = 16, max_frame_bytes: int = 8192):
+        # write_frame(frame, carries_connect) does the actual socket write
+        self.write_frame = write_frame
+        self.max_batch = max_batch
+        self.max_frame_bytes = max_frame_bytes
+        self.logger = logging.getLogger(__name__)
+        self._heap: List[tuple] = []
+        self._sequence = 0
+        self._writing = False
+        self._wakeup = None
+        self._task = None
+
+        self.frames = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.wait_stats: Dict[int, _WaitStats] = {priority: _WaitStats() for priority in _PRIORITY_NAMES}
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer; messages still queued fail with ConnectionError"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._writing = False
+        while self._heap:
+            future = heapq.heappop(self._heap)[5]
+            if not future.done():
+                future.set_exception(ConnectionError("WebSocket closed before the message was sent"))
+
+    async def send(self, message: str, priority: int = PRIORITY_CONTROL, connect: bool = False) -> None:
+        """Write one message, returning once its frame was written"""
+        enqueued_at = time.perf_counter()
+        if not self._writing and not self._heap:
+            # Idle: write inline, no hand-off to the writer task
+            self._writing = True
+            try:
+                await self.write_frame('[' + message + ']', connect)
+            finally:
+                self._writing = False
+                if self._heap:
+                    self._wakeup.set()
+            self.frames += 1
+            self.wait_stats[priority].add(time.perf_counter() - enqueued_at)
+            return
+
+        if self._task is None:
+            raise ConnectionError("WebSocket not connected")
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._heap, (priority, self._sequence, message, connect, enqueued_at, future))
+        if len(self._heap) > self.max_depth:
+            self.max_depth = len(self._heap)
+        self._wakeup.set()
+        await future
+
+    def _take_batch(self) -> List[tuple]:
+        batch = [heapq.heappop(self._heap)]
+        if batch[0][0] == PRIORITY_ANSWER:
+            return batch
+        size = len(batch[0][2])
+        while self._heap and len(batch) < self.max_batch:
+            size += len(self._heap[0][2]) + 1
+            if size > self.max_frame_bytes:
+                break
+            batch.append(heapq.heappop(self._heap))
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap or self._writing:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            batch = self._take_batch()
+            frame = '[' + ','.join(item[2] for item in batch) + ']'
+            self._writing = True
+            try:
+                await self.write_frame(frame, any(item[3] for item in batch))
+            except asyncio.CancelledError:
+                for item in batch:
+                    if not item[5].done():
+                        item[5].set_exception(ConnectionError("WebSocket closed before the message was sent"))
+                raise
+            except Exception as e:
+                for item in batch:
+                    if not item[5].done():
+                        item[5].set_exception(e)
+                continue
+            finally:
+                self._writing = False
+
+            written_at = time.perf_counter()
+            self.frames += 1
+            if len(batch) > 1:
+                self.coalesced += len(batch)
+            for priority, _, _, _, enqueued_at, future in batch:
+                self.wait_stats[priority].add(written_at - enqueued_at)
+                if not future.done():
+                    future.set_result(None)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._heap),
+            "max_depth": self.max_depth,
+            "frames": self.frames,
+            "coalesced": self.coalesced,
+            "priorities": {name: self.wait_stats[priority].as_dict() for priority, name in _PRIORITY_NAMES.items()},
+        }
@@ -1,37 +1,94 @@
 from ..Context import shared_context
+from .DnsCache import DnsCache
+from typing import Optional
+import importlib.util
 import httpx
 import asyncio
 import logging
+import time
 
 class SessionManager:
-    def __init__(self):
+    """Fetches reserve sessions over one long-lived, pooled HTTP client"""
+
+    def __init__(self,
+                 http2: bool = False,
+                 timeout: float = 10.0,
+                 max_keepalive_connections: int = 4,
+                 keepalive_expiry: float = 60.0,
+                 dns_cache: Optional[DnsCache] = None):
         self.logger = logging.getLogger(__name__)
+        # HTTP/2 needs the h2 package (pip install httpx[http2])
+        if http2 and importlib.util.find_spec("h2") is None:
+            self.logger.warning("HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        # Shared with the WebSocket client, whose host warm_up() resolves ahead of time
+        self.dns_cache = dns_cache or DnsCache()
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(http2=self.http2, timeout=self.timeout, limits=self.limits)
+        return self.client
+
+    async def _get(self, url: str, method: str = "GET") -> httpx.Response:
+        # Requests go to the host name: the pooled connection is reused while it is kept
+        # alive, and a new one gets httpx's own resolution and fallback across addresses
+        return await self._get_client().request(method, url)
+
+    async def _prime_dns(self, url: str) -> None:
+        """Resolve the host of url into the shared DnsCache, for the early WebSocket socket"""
+        url = httpx.URL(url)
+        port = url.port or (443 if url.scheme in ("https", "wss") else 80)
+        try:
+            await self.dns_cache.resolve_all(url.host, port)
+        except OSError as e:
+            self.logger.debug(f"Could not resolve {url.host}: {e}")
+
+    async def warm_up(self) -> bool:
+        """Resolve the Kahoot host and open a kept-alive connection to it, before the PIN is known"""
+        started = time.perf_counter()
+        await self._prime_dns(shared_context.websocket_url)
+        try:
+            await self._get(f"{shared_context.base_url}/", method="HEAD")
+        except Exception as e:
+            self.logger.warning(f"HTTP warm-up failed: {e}")
+            return False
+        self.logger.info(f"HTTP connection warmed up in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return True
 
     async def get_session(self) -> dict:
         """Retrieve session token and challenge from Kahoot server"""
         try:
             timestamp = int(asyncio.get_event_loop().time() * 1000)
-            url = f"https://kahoot.it/reserve/session/{shared_context.game_pin}/?{timestamp}"
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                
-                if response.status_code == 200:
-                    session_token = response.headers.get('x-kahoot-session-token')
-                    challenge_data = response.json()
-                    challenge = challenge_data.get('challenge', '')
-                    
-                    if session_token and challenge:
-                        self.logger.info("Successfully retrieved session data")
-                        return {
-                            'session_token': session_token,
-                            'challenge': challenge
-                        }
-                    else:
-                        raise ValueError("Missing session token or challenge")
+            url = f"{shared_context.base_url}/reserve/session/{shared_context.game_pin}/?{timestamp}"
+
+            response = await self._get(url)
+
+            if response.status_code == 200:
+                session_token = response.headers.get('x-kahoot-session-token')
+                challenge_data = response.json()
+                challenge = challenge_data.get('challenge', '')
+
+                if session_token and challenge:
+                    self.logger.info("Successfully retrieved session data")
+                    return {
+                        'session_token': session_token,
+                        'challenge': challenge
+                    }
                 else:
-                    raise ConnectionError(f"HTTP error: {response.status_code}")
-                    
+                    raise ValueError("Missing session token or challenge")
+            else:
+                raise ConnectionError(f"HTTP error: {response.status_code}")
+
         except Exception as e:
             self.logger.error(f"Session acquisition failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
@@ -0,0 +1,100 @@
+# KahootConnect/Networking/SessionReplay.py
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from ..Context import shared_context
+from ..Packets.Handlers.GameEventHandler import GameEventHandler
+from .WebSocketClient import WebSocketClient
+
+class RecordedFrame(NamedTuple):
+    wall_time: float
+    monotonic_time: float
+    direction: str
+    frame: str
+
+def read_session(path: str) -> Iterator[RecordedFrame]:
+    """Yield the frames of a packet log written by PacketRecorder"""
+    with open(path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            parts = line.split(" ", 3)
+            if len(parts) != 4 or parts[2] not in ("in", "out"):
+                raise ValueError(f"{path}:{line_number}: not a PacketRecorder line")
+            yield RecordedFrame(float(parts[0]), float(parts[1]), parts[2], parts[3])
+
+class ReplayTransport(WebSocketClient):
+    """WebSocketClient stand-in that captures outbound messages instead of sending them"""
+
+    def __init__(self):
+        super().__init__()
+        self.is_connected = True
+        self.sent: List[str] = []
+
+    async def send_packet(self, packet: Dict[str, Any], priority: Optional[int] = None) -> None:
+        self.sent.append('[' + shared_context.protocol.prepare(packet) + ']')
+
+    async def send_encoded(self, message: str, priority: Optional[int] = None) -> None:
+        self.sent.append('[' + message + ']')
+
+class SessionReplayer:
+    """Replays a recorded session through GameEventHandler.handle_packet and its callbacks.
+
+    speed=None replays as fast as possible, speed=1.0 at recorded speed, 2.0 twice as fast.
+    """
+
+    def __init__(self, path: str, game_event_handler=None, speed: Optional[float] = None):
+        self.path = path
+        self.speed = speed
+        self.game_event_handler = game_event_handler
+        self.transport = ReplayTransport()
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self) -> Dict[str, Any]:
+        """Replay every inbound frame and return throughput statistics"""
+        handler = self.game_event_handler or GameEventHandler()
+        previous = (shared_context.websocket_client, shared_context.game_event_handler)
+        shared_context.websocket_client = self.transport
+        shared_context.game_event_handler = handler
+
+        frames = 0
+        messages = 0
+        first_recorded = None
+        started = time.perf_counter()
+        try:
+            for recorded in read_session(self.path):
+                if recorded.direction != "in":
+                    continue
+
+                if self.speed:
+                    if first_recorded is None:
+                        first_recorded = recorded.monotonic_time
+                    target = (recorded.monotonic_time - first_recorded) / self.speed
+                    delay = target - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                frames += 1
+                # The protocol picks up the recorded client ID from the handshake reply
+                for packet in self.transport._decode_frame(recorded.frame):
+                    messages += 1
+                    await handler.handle_packet(packet)
+
+                # Let the callback tasks created for this frame run, as they would live
+                await asyncio.sleep(0)
+        finally:
+            shared_context.websocket_client, shared_context.game_event_handler = previous
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "frames": frames,
+            "messages": messages,
+            "sent": len(self.transport.sent),
+            "elapsed": elapsed,
+            "messages_per_second": messages / elapsed if elapsed else 0.0,
+        }
+        self.logger.info(f"Replayed {messages} messages from {self.path} in {elapsed:.3f}s")
+        return stats
@@ -1,152 +1,341 @@
 import websockets
-import json
 import asyncio
 import logging
-from typing import Dict, Any, Callable, Optional
+import socket
+import ssl
+import time
+import urllib.parse
+from typing import AsyncIterator, Dict, Any, Callable, List, Optional
 from ..Context import shared_context
+from ..EventLog import EventLogger
 from ..Packets.Messages.PacketFactory import PacketFactory
+from ..Protocol.Events import ConnectReply, HandshakeReply
+from ..Protocol.ParsedMessage import ParsedMessage
+from .PacketRecorder import PacketRecorder
+from .DnsCache import DnsCache
+from .HeartbeatScheduler import HeartbeatScheduler
+from .SendQueue import SendQueue, PRIORITY_ANSWER, PRIORITY_CONTROL, PRIORITY_HEARTBEAT
+
+def _frame_size(frame) -> int:
+    """Size of a frame on the wire, without encoding ASCII text (nearly every frame)"""
+    if isinstance(frame, str) and not frame.isascii():
+        return len(frame.encode('utf-8'))
+    return len(frame)
 
 class WebSocketClient:
-    def __init__(self):
+    def __init__(self, max_queue_size: int = 256, recorder: Optional[PacketRecorder] = None,
+                 dns_cache: Optional[DnsCache] = None, connect_timeout: float = 3.0):
         self.websocket = None
-        self.client_id = None
         self.is_connected = False
-        self.ack_counter = 0
         self.logger = logging.getLogger(__name__)
-        self.heartbeat_task = None
-        self.receive_timeout = 1.0  # 1 second timeout for receiving
+        self.event_log = EventLogger(__name__)
+        # Sole sender of /meta/connect once the handshake is done
+        self.heartbeat = HeartbeatScheduler()
+        # Every frame is written through here, answers first
+        self.send_queue = SendQueue(self._write_frame)
+        self.reader_task = None
+        self.receive_timeout = 1.0  # 1 second timeout for handshake receives
+        # Bounded so a slow consumer pauses the reader instead of buffering forever
+        self.max_queue_size = max_queue_size
+        self.incoming = None
+        self.recorder = recorder
+        self.url = None
+        # time.monotonic() of the last received frame, watched for missed heartbeats
+        self.last_received = 0.0
+        # time.perf_counter() at which the reader saw the connection end
+        self.closed_at = 0.0
+        self.dns_cache = dns_cache or DnsCache()
+        # Seconds open_socket() gives each address; a passed-in socket is not covered by
+        # the websockets open_timeout, and an unanswered SYN would wait for the kernel
+        self.connect_timeout = connect_timeout
+        # Built once instead of on every wss:// connect
+        self._ssl_context = None
+
+    async def open_socket(self, url: str) -> socket.socket:
+        """Resolve the host of url and open a TCP connection to it, for connect(sock=...).
+
+        The addresses of the host are tried in turn, each for at most `connect_timeout`
+        seconds, so an unreachable one (e.g. a broken IPv6 route) falls through to the
+        next instead of failing or stalling the connect.
+        """
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme in ("wss", "https")
+        port = parts.port or (443 if secure else 80)
+        addresses = await self.dns_cache.resolve_all(parts.hostname, port)
+        if secure and self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+
+        loop = asyncio.get_running_loop()
+        error = None
+        for address in addresses:
+            sock = socket.socket(socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            # asyncio only disables Nagle on sockets it creates itself
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (address, port)), self.connect_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                sock.close()
+                self.logger.debug(f"TCP connect to {address}:{port} failed: {e!r}")
+                self.dns_cache.demote(parts.hostname, address)
+                error = e
+                continue
+            except BaseException:
+                sock.close()
+                raise
+            return sock
 
-    async def connect(self, url: str) -> bool:
-        """Connect to WebSocket URL"""
+        # Every address failed, the next attempt resolves the host again
+        self.dns_cache.invalidate(parts.hostname)
+        raise error
+
+    async def connect(self, url: str, sock: Optional[socket.socket] = None) -> bool:
+        """Connect to WebSocket URL, over an already connected socket if one is given"""
         try:
-            self.websocket = await websockets.connect(url)
+            kwargs = {}
+            if sock is not None:
+                kwargs["sock"] = sock
+            if url.startswith("wss:"):
+                if self._ssl_context is None:
+                    self._ssl_context = ssl.create_default_context()
+                kwargs["ssl"] = self._ssl_context
+            self.websocket = await websockets.connect(url, **kwargs)
+            self.url = url
             self.is_connected = True
+            self.last_received = time.monotonic()
+            self.closed_at = 0.0
             self.logger.info(f"Connected to WebSocket: {url}")
-            
-            # Start heartbeat task
-            self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+            # Packet log is written from a background thread, off the event loop
+            if shared_context.debug and self.recorder is None:
+                self.recorder = PacketRecorder()
+            if self.recorder:
+                self.recorder.start()
+
+            # Start reader and writer tasks
+            self._replace_queue()
+            self.reader_task = asyncio.create_task(self._reader_loop())
+            self.send_queue.start()
             
             return True
         except Exception as e:
+            if sock is not None:
+                sock.close()
             self.logger.error(f"WebSocket connection failed: {e}")
             return False
 
-    async def _heartbeat_loop(self):
-        """Maintain heartbeat with server"""
-        while self.is_connected and self.websocket:
-            try:
-                # Send heartbeat every 10 seconds
-                await asyncio.sleep(10)
-                if self.is_connected and self.client_id:
-                    await self.send_heartbeat()
-            except Exception as e:
-                self.logger.error(f"Heartbeat error: {e}")
-                break
-
-    async def send_heartbeat(self):
-        """Send heartbeat packet"""
-        if not self.is_connected or not self.websocket:
-            return
-            
-        heartbeat_packet = {
-            "id": str(shared_context.message_counter),
-            "channel": "/meta/connect",
-            "connectionType": "websocket",
-            "clientId": self.client_id,
-            "ext": {
-                "ack": self.ack_counter,
-                "timesync": {
-                    "tc": self._get_timestamp(),
-                    "l": 0,
-                    "o": 0
-                }
-            }
-        }
-        
-        await self.send_packet(heartbeat_packet)
-        self.logger.debug(f"Sent heartbeat with ack: {self.ack_counter}")
-
-    def _get_timestamp(self) -> int:
-        """Get current timestamp in milliseconds"""
-        return int(asyncio.get_event_loop().time() * 1000)
-
-    async def send_packet(self, packet: Dict[str, Any]) -> None:
+    async def send_packet(self, packet: Dict[str, Any], priority: Optional[int] = None) -> None:
         """Send packet to WebSocket"""
         if not self.is_connected or not self.websocket:
             raise ConnectionError("WebSocket not connected")
         
-        await self.websocket.send(json.dumps([packet]))
-        if shared_context.debug:
-            file1 = open("packet_log.txt", "a")
-            file1.write(f"Sent: {packet}\n") ##################################################################################################
-            file1.close()
-        self.logger.debug(f"Sent packet: {packet}")
-        shared_context.message_counter += 1
-
-    async def receive_packet(self) -> Optional[Dict[str, Any]]:
-        """Receive packet from WebSocket with timeout"""
-        if not self.is_connected or not self.websocket:
-            self.logger.debug("WebSocket not connected, returning None")
-            return None
-        
+        # The message id is taken when the packet is queued, so ids follow send order
+        message = shared_context.protocol.prepare(packet)
+        channel = packet.get("channel")
+        connect = channel == "/meta/connect"
+        if priority is None:
+            priority = PRIORITY_HEARTBEAT if connect else PRIORITY_CONTROL
+
+        await self.send_queue.send(message, priority, connect)
+        shared_context.metrics.packets_sent.inc(1, channel or "")
+        self.event_log.debug("packet.sent", "Sent packet: %s", packet, channel=channel)
+
+    async def _write_frame(self, frame: str, connect: bool) -> None:
+        """The one place frames are written, called by the send queue"""
+        await self._send_frame(frame)
+        self.heartbeat.note_sent(connect=connect)
+        shared_context.metrics.bytes_sent.inc(_frame_size(frame))
+        if self.recorder:
+            self.recorder.record("out", frame)
+
+    async def _send_frame(self, frame: str) -> None:
         try:
-            message = await asyncio.wait_for(
-                self.websocket.recv(), 
-                timeout=self.receive_timeout
-            )
-            
-            if not message:
-                return None
-                
-            self.logger.debug(f"Raw message received: {message}")
+            await self.websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed as e:
+            # Surfaced like any other send on a lost connection
+            self.is_connected = False
+            raise ConnectionError(f"WebSocket connection closed: {e}") from e
+
+    def _decode_frame(self, message: str) -> List[ParsedMessage]:
+        """Decode a Bayeux frame into every message it carries, in order.
+
+        The protocol reads the frame and keeps the ack, client ID and clock up to date;
+        what is left here is feeding the heartbeat scheduler and the metrics.
+        """
+        received_at = time.perf_counter()
+        events = shared_context.protocol.receive_frame(message, received_at)
+        metrics = shared_context.metrics
+        metrics.parse_time.observe(time.perf_counter() - received_at)
+
+        packets = []
+        for event in events:
+            packet = event.message
+            metrics.packets_received.inc(1, packet.channel)
+            event_type = type(event)
+            if event_type is ConnectReply:
+                if event.ack is not None:
+                    self.event_log.debug("ack.updated", "Updated ack counter to: %s", shared_context.ack_counter)
+                self.heartbeat.on_connect_reply(packet.packet)
+                if event.round_trip is not None:
+                    metrics.heartbeat_rtt.observe(event.round_trip / 1000)
+            elif event_type is HandshakeReply:
+                self.heartbeat.apply_advice(event.advice)
+            packets.append(packet)
+
+        return packets
+
+    async def _reader_loop(self):
+        """Read frames for the lifetime of the connection and queue their messages"""
+        try:
+            async for message in self.websocket:
+                if not message:
+                    continue
+
+                self.last_received = time.monotonic()
+                shared_context.metrics.bytes_received.inc(_frame_size(message))
+                self.event_log.debug("frame.raw", "Raw message received: %s", message)
+                if self.recorder:
+                    self.recorder.record("in", message)
+
+                try:
+                    packets = self._decode_frame(message)
+                except ValueError as e:
+                    self.logger.warning(f"Failed to decode frame: {e}")
+                    continue
+
+                if not packets:
+                    continue
+
+                # Blocks while the queue is full, which stops reading from the socket
+                await self.incoming.put(packets)
 
-            packets = json.loads(message)
-            
-            if not packets:
-                return {}
-                
-            packet = packets[0] if packets else {}
-
-            if shared_context.debug:
-                file1 = open("packet_log.txt", "a")
-                file1.write(f"Received: {packet}\n") ##################################################################################################
-                file1.close()
-            
-            # CRITICAL FIX: Only update ack counter for connect messages with ack field
-            if (packet.get('channel') == '/meta/connect' and 
-                packet.get('ext') and 
-                'ack' in packet['ext']):
-                
-                received_ack = packet['ext']['ack']
-                # The next ack we send should be received_ack + 1
-                shared_context.ack_counter = received_ack + 1
-                self.logger.debug(f"Updated ack counter to: {shared_context.ack_counter}")
-                    
-            self.logger.debug(f"Processed packet: {packet.get('channel', 'unknown')}")
-            return packet
-            
-        except asyncio.TimeoutError:
-            return None
         except websockets.exceptions.ConnectionClosed as e:
             self.logger.info(f"WebSocket connection closed: {e}")
-            self.is_connected = False
-            return None
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             self.logger.error(f"Unexpected error receiving packet: {e}")
-            return None
+        finally:
+            self.is_connected = False
+            self.closed_at = time.perf_counter()
+            # Wake up any consumer waiting on the queue
+            self._close_queue()
 
-    async def disconnect(self) -> None:
-        """Disconnect from WebSocket"""
+    def _replace_queue(self):
+        """Start a new queue, carrying over what the previous connection left unconsumed"""
+        previous = self.incoming
+        self.incoming = asyncio.Queue(maxsize=self.max_queue_size)
+        if previous is None:
+            return
+        while not previous.empty():
+            packets = previous.get_nowait()
+            if packets is not None:
+                self.incoming.put_nowait(packets)
+        # A consumer still waiting on the old queue wakes up and moves to the new one
+        previous.put_nowait(None)
+
+    def _close_queue(self):
+        """Push the end-of-stream marker without blocking"""
+        try:
+            self.incoming.put_nowait(None)
+        except asyncio.QueueFull:
+            # Consumers notice the finished reader once they drain the queue
+            pass
+
+    async def send_encoded(self, message: str, priority: int = PRIORITY_CONTROL) -> None:
+        """Send a single pre-encoded message (e.g. from PacketFactory.encode_reaction)"""
+        if not self.is_connected or not self.websocket:
+            raise ConnectionError("WebSocket not connected")
+
+        # Its id was taken from the protocol when it was encoded
+        await self.send_queue.send(message, priority)
+        shared_context.metrics.packets_sent.inc(1, "/service/controller")
+        self.event_log.debug("packet.sent", "Sent encoded message: %s", message, channel="/service/controller")
+
+    async def send_answer(self, message: str) -> None:
+        """Send a pre-encoded answer, ahead of any queued control message or heartbeat"""
+        await self.send_encoded(message, PRIORITY_ANSWER)
+
+    async def receive_packets(self, timeout: Optional[float] = None) -> List[ParsedMessage]:
+        """Return the messages of the next received frame, or an empty list on timeout or close"""
+        incoming = self.incoming
+        if incoming is None:
+            self.logger.debug("WebSocket not connected, returning empty batch")
+            return []
+
+        if incoming.empty() and self.reader_task and self.reader_task.done():
+            return []
+
+        try:
+            if timeout is None:
+                packets = await incoming.get()
+            else:
+                packets = await asyncio.wait_for(incoming.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        if packets is None:
+            # Keep the marker so later calls also see the end of the stream
+            incoming.put_nowait(None)
+            return []
+
+        return packets
+
+    def buffered_packets(self) -> List[ParsedMessage]:
+        """Take the messages of the frames already received, without waiting for more"""
+        incoming = self.incoming
+        packets = []
+        if incoming is None:
+            return packets
+        for _ in range(incoming.qsize()):
+            frame = incoming.get_nowait()
+            if frame is None:
+                # Keep the end-of-stream marker for messages()
+                incoming.put_nowait(None)
+                break
+            packets.extend(frame)
+        return packets
+
+    async def messages(self) -> AsyncIterator[ParsedMessage]:
+        """Yield every received message in order until the connection closes"""
+        while True:
+            packets = await self.receive_packets()
+            if not packets:
+                return
+            for packet in packets:
+                yield packet
+
+    def abort(self) -> None:
+        """Drop the connection at once, without a closing handshake (used on a dead link)"""
+        transport = getattr(self.websocket, "transport", None)
+        if transport is not None:
+            transport.abort()
+
+    async def close(self) -> None:
+        """Close the connection and stop its tasks, keeping the recorder running"""
         self.is_connected = False
         
-        # Cancel heartbeat task
-        if self.heartbeat_task:
-            self.heartbeat_task.cancel()
+        # Cancel background tasks
+        await self.heartbeat.stop()
+        await self.send_queue.stop()
+        if self.reader_task:
+            self.reader_task.cancel()
             try:
-                await self.heartbeat_task
+                await self.reader_task
             except asyncio.CancelledError:
                 pass
+        self.reader_task = None
         
         if self.websocket:
-            await self.websocket.close()
-        self.logger.info("WebSocket disconnected")
\ No newline at end of file
+            try:
+                await self.websocket.close()
+            except Exception as e:
+                self.logger.debug(f"Error closing WebSocket: {e}")
+
+    async def disconnect(self) -> None:
+        """Disconnect from WebSocket"""
+        await self.close()
+
+        if self.recorder:
+            await asyncio.get_running_loop().run_in_executor(None, self.recorder.stop)
+        self.logger.info("WebSocket disconnected")
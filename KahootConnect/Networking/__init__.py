@@ -1,4 +1,9 @@
 from .WebSocketClient import WebSocketClient
 from .SessionManager import SessionManager
+from .DnsCache import DnsCache
+from .HeartbeatScheduler import HeartbeatScheduler
+from .SendQueue import SendQueue, PRIORITY_ANSWER, PRIORITY_CONTROL, PRIORITY_HEARTBEAT
+from .PacketRecorder import PacketRecorder
+from .SessionReplay import SessionReplayer, ReplayTransport, read_session
 
-__all__ = ['WebSocketClient', 'SessionManager']
\ No newline at end of file
+__all__ = ['WebSocketClient', 'SessionManager', 'DnsCache', 'HeartbeatScheduler', 'SendQueue', 'PRIORITY_ANSWER', 'PRIORITY_CONTROL', 'PRIORITY_HEARTBEAT', 'PacketRecorder', 'SessionReplayer', 'ReplayTransport', 'read_session']
\ No newline at end of file
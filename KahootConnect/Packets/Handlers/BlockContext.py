@@ -1,37 +1,88 @@
+import time
 import asyncio
 from typing import Union, List, Optional
 from ...Context import shared_context
+from ...EventLog import EventLogger
 from ..Messages.PacketFactory import PacketFactory
+from ..Messages.ParsedMessage import ParsedMessage
+from .GameBlock import GameBlock
+
+_events = EventLogger(__name__)
 
 class BlockContext:
-    """Context for a game block (question)"""
-    
-    def __init__(self, block_index: int, gameBlock: dict):
+    """Context for a game block (question), a view over its GameBlock"""
+
+    __slots__ = ('index', 'status', 'gameBlock', 'message', 'received_at', 'dispatched_at',
+                 'answer_started_at', 'answer_sent_at', 'logger')
+
+    def __init__(self, block_index: int, gameBlock: GameBlock, message: Optional[ParsedMessage] = None):
         self.index = block_index
-        self.type = (gameBlock.get("content") or {}).get("type", "unknown")
-        self.data = gameBlock.get("content", "unknown")
-        self.status = gameBlock.get("status", "unknown")
-        self.pointsData = gameBlock.get("results", {}).get("pointsData")
-        self.hasAnswer = gameBlock.get("results", {}).get("hasAnswer")
-        self.skip = gameBlock.get("results", {}).get("skip")
-        self.points = gameBlock.get("results", {}).get("points")
-        self.isCorrect = gameBlock.get("results", {}).get("isCorrect")
-        self.correctAnswers = gameBlock.get("results", {}).get("correctAnswers")
-        self.answers = gameBlock.get("results", {}).get("answers")
+        # Status as of the event that produced this context
+        self.status = gameBlock.status
         self.gameBlock = gameBlock
+        # The /service/player message that produced this update
+        self.message = message
+
+        # time.perf_counter() stamps of the reaction chain, for latency measurements
+        self.received_at = message.received_at if message else 0.0
+        self.dispatched_at = 0.0
+        self.answer_started_at = 0.0
+        # Stamp of a staged answer flushed by GameEventHandler on the start event
+        self.answer_sent_at = gameBlock.answer_sent_at
 
-        self._answered = False
         self.logger = shared_context.websocket_client.logger if shared_context.websocket_client else None
 
-    def _is_answer_valid(self, answer) -> tuple[bool, str]:
+    @property
+    def type(self) -> str:
+        return self.gameBlock.type
+
+    @property
+    def data(self) -> dict:
+        return self.gameBlock.content
+
+    @property
+    def pointsData(self):
+        return self.gameBlock.points_data
+
+    @property
+    def hasAnswer(self):
+        return self.gameBlock.has_answer
+
+    @property
+    def skip(self):
+        return self.gameBlock.skip
+
+    @property
+    def points(self):
+        return self.gameBlock.points
+
+    @property
+    def isCorrect(self):
+        return self.gameBlock.is_correct
+
+    @property
+    def correctAnswers(self):
+        return self.gameBlock.correct_answers
+
+    @property
+    def answers(self):
+        return self.gameBlock.answers
+
+    @property
+    def _answered(self) -> bool:
+        # Kept on the block so every context of the question sees it
+        return self.gameBlock.answered
+
+    @_answered.setter
+    def _answered(self, answered: bool) -> None:
+        self.gameBlock.answered = answered
+
+    def _is_answer_valid(self, answer, require_started: bool = True) -> tuple[bool, str]:
         """Check if answer is valid"""
-        gameBlock = shared_context.game_event_handler.gameBlocks.get(self.index)
-        if not gameBlock:
-            return False, "Question not found in game blocks"
-        
-        content = gameBlock.get("content")
+        gameBlock = self.gameBlock
+        content = gameBlock.content
 
-        if gameBlock.get("status") != "started":
+        if require_started and gameBlock.status != "started":
             return False, "Question is not active"
         
         if content.get("type") == "slider":
@@ -61,6 +112,29 @@ class BlockContext:
 
         return True, "Valid answer"
 
+    def _select_answer(self,
+                       choice: Optional[Union[int, List[int], str]],
+                       text: Optional[str],
+                       value: Optional[int]):
+        """Pick the answer argument required by the question type"""
+        if self.type in ['quiz', 'multiple_select_quiz']:
+            if choice is None:
+                raise ValueError(f"Choice required for {self.type}")
+            return choice
+        elif self.type == 'open_ended':
+            if text is None:
+                raise ValueError("Text required for open_ended question")
+            return text
+        elif self.type == 'slider':
+            if value is None:
+                raise ValueError("Value required for slider question")
+            return value
+        elif self.type == 'jumble':
+            if choice is None or not isinstance(choice, list):
+                raise ValueError("Choice (list) required for jumble question")
+            return choice
+        raise ValueError(f"Unsupported question type: {self.type}")
+
     async def answer(self, 
                     choice: Optional[Union[int, List[int], str]] = None,
                     text: Optional[str] = None,
@@ -90,48 +164,120 @@ class BlockContext:
             self.logger.error(f"❌ Invalid answer: {is_answer_valid_message}")
             return False
 
+        # Only an answer that is going out may stamp the start of the send
+        self.answer_started_at = time.perf_counter()
         try:
-            packet_factory = PacketFactory()
-            
-            if self.type in ['quiz', 'multiple_select_quiz']:
-                if choice is None:
-                    raise ValueError(f"Choice required for {self.type}")
-                
-                if self.type == 'quiz':
-                    packet = packet_factory.create_classic_answer(self.index, choice)
-                else:  # multiple_select_quiz
-                    packet = packet_factory.create_multiple_select_answer(self.index, choice)
-                    
-            elif self.type == 'open_ended':
-                if text is None:
-                    raise ValueError("Text required for open_ended question")
-                packet = packet_factory.create_open_ended_answer(self.index, text)
-                
-            elif self.type == 'slider':
-                if value is None:
-                    raise ValueError("Value required for slider question")
-                packet = packet_factory.create_slider_answer(self.index, value)
-            elif self.type == 'jumble':
-                if choice is None or not isinstance(choice, list):
-                    raise ValueError("Choice (list) required for jumble question")
-                packet = packet_factory.create_jumble_answer(self.index, choice)
-                
-            else:
-                raise ValueError(f"Unsupported question type: {self.type}")
-
-            await shared_context.websocket_client.send_packet(packet)
+            answer_value = self._select_answer(choice, text, value)
+
+            # Pre-serialized template, only the id, index and answer are substituted
+            message = PacketFactory.encode_answer(self.type, self.index, answer_value)
+            await shared_context.websocket_client.send_answer(message)
+            self.answer_sent_at = time.perf_counter()
             self._answered = True
+            shared_context.metrics.answer_latency.observe(self.answer_sent_at - self.answer_started_at)
             
-            if self.logger:
-                self.logger.info(f"✅ Sent answer for question {self.index}: {self.type}")
+            _events.info("answer.sent", "✅ Sent answer for question %s: %s", self.index, self.type,
+                         block=self.index, type=self.type)
             return True
+
+        except ConnectionError as e:
+            # Connection is down: keep the answer for the reconnect to send
+            reconnect_handler = shared_context.reconnect_handler
+            if reconnect_handler is not None and reconnect_handler.queue_answer(self.index, self.type, answer_value):
+                self._answered = True
+                if self.logger:
+                    self.logger.warning(f"🔌 {e}, answer for question {self.index} queued until reconnected")
+                return True
+            if self.logger:
+                self.logger.error(f"❌ Failed to send answer: {e}")
+            return False
             
         except Exception as e:
             if self.logger:
                 self.logger.error(f"❌ Failed to send answer: {e}")
             return False
 
+    def stage_answer(self,
+                     choice: Optional[Union[int, List[int], str]] = None,
+                     text: Optional[str] = None,
+                     value: Optional[int] = None) -> bool:
+        """
+        Stage an answer while the question is awaiting (after the prefetch).
+        It is validated and serialized now and sent by GameEventHandler the moment
+        the start event arrives, before any onGameBlockUpdate handler runs.
+        Takes the same arguments as answer(); staging again replaces the staged answer.
+        If the question has started by the time this runs, the answer is sent right away.
+        """
+        # The block's status, not this context's: the start may have been handled already
+        status = self.gameBlock.status
+        if status not in ("awaiting", "started") or self._answered:
+            if self.logger:
+                self.logger.warning(f"Can only stage answers for open questions (status: {status})")
+            return False
+
+        answer_arg = next((arg for arg in (choice, text, value) if arg is not None), None)
+        is_answer_valid, is_answer_valid_message = self._is_answer_valid(answer=answer_arg, require_started=False)
+        if not is_answer_valid:
+            if self.logger:
+                self.logger.error(f"❌ Invalid staged answer: {is_answer_valid_message}")
+            return False
+
+        game_event_handler = shared_context.game_event_handler
+        if status == "started":
+            # The staged answers were flushed on start, this one would never go out
+            game_event_handler.executor.submit(self.answer(choice, text, value), "stage_answer",
+                                               block_index=self.index)
+            if self.logger:
+                self.logger.info(f"📌 Question {self.index} already started, sending the answer now")
+            return True
+
+        try:
+            answer_value = self._select_answer(choice, text, value)
+            shared_context.game_event_handler.staged_answers[self.index] = (
+                PacketFactory.stage_answer(self.type, self.index, answer_value)
+            )
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"❌ Failed to stage answer: {e}")
+            return False
+
+        if self.logger:
+            self.logger.info(f"📌 Staged answer for question {self.index}: {self.type}")
+        return True
+
+    def cancel_staged_answer(self) -> bool:
+        """Drop the staged answer of this question, returns whether one was staged"""
+        return shared_context.game_event_handler.staged_answers.pop(self.index, None) is not None
+
+    @property
+    def time_available(self) -> Optional[int]:
+        """Length of the answer window in milliseconds"""
+        return self.gameBlock.time_available
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Server wall-clock time (ms) at which the answer window closes, once the question started"""
+        start_time = self.gameBlock.start_time
+        if self.status == "awaiting" or not start_time or self.time_available is None:
+            return None
+        return start_time + self.time_available
+
+    @property
+    def loop_deadline(self) -> Optional[float]:
+        """Event loop time by which an answer must be sent to reach the server in time"""
+        remaining = self.time_left()
+        if remaining is None:
+            return None
+        return asyncio.get_running_loop().time() + remaining
+
+    def time_left(self) -> Optional[float]:
+        """Seconds left to send an answer, from the synced server clock minus network lag"""
+        deadline = self.deadline
+        if deadline is None:
+            return None
+        clock = shared_context.clock
+        return max(0.0, (deadline - clock.server_time_ms() - clock.lag) / 1000)
+
     def is_active(self) -> bool:
         """Check if the question is still active"""
-        game_block = shared_context.game_event_handler.gameBlocks.get(self.index, {})
-        return game_block.get("status") == "started" and not self._answered
\ No newline at end of file
+        return self.gameBlock.status == "started" and not self._answered
\ No newline at end of file
@@ -0,0 +1,150 @@
+import inspect
+import asyncio
+import logging
+import itertools
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple, Union
+
+Filter = Optional[Union[Any, Collection[Any]]]
+
+def _as_filter(value: Filter) -> Optional[frozenset]:
+    """Normalize a filter to a set of accepted values (None accepts anything)"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    return frozenset((value,))
+
+# Dispatch table key for a value no subscriber filters on
+_UNFILTERED = object()
+
+class Subscription:
+    """A handler registered for one event, with its filters"""
+
+    __slots__ = ('event', 'handler', 'block_type', 'status', 'block_index', 'priority', 'once', 'order', 'active')
+
+    def __init__(self, event: str, handler: Callable, block_type: Filter, status: Filter,
+                 block_index: Filter, priority: int, once: bool, order: int):
+        self.event = event
+        self.handler = handler
+        self.block_type = _as_filter(block_type)
+        self.status = _as_filter(status)
+        self.block_index = _as_filter(block_index)
+        self.priority = priority
+        self.once = once
+        self.order = order
+        self.active = True
+
+    def matches(self, block_type: Any, status: Any, block_index: Any) -> bool:
+        return ((self.block_type is None or block_type in self.block_type) and
+                (self.status is None or status in self.status) and
+                (self.block_index is None or block_index in self.block_index))
+
+class EventBus:
+    """Many subscribers per event, filtered by block type, status and block index.
+
+    Matching subscribers are resolved once per (event, type, status, index) combination
+    and cached in a per-event dispatch table, which is rebuilt only when the
+    subscriptions of that event change. Values no subscriber filters on share one key,
+    so the table is bounded by the filters instead of growing with every question.
+    """
+
+    def __init__(self, executor=None):
+        self.logger = logging.getLogger(__name__)
+        # HandlerExecutor running coroutine handlers; plain tasks without one
+        self.executor = executor
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        # Event -> (values filtered on per dimension, key -> matching subscribers)
+        self._dispatch_tables: Dict[str, Tuple[Tuple[frozenset, frozenset, frozenset],
+                                               Dict[Tuple[Any, Any, Any], Tuple[Subscription, ...]]]] = {}
+        self._order = itertools.count()
+        self._unhandled_logged = set()
+
+    def subscribe(self,
+                  event: str,
+                  handler: Callable,
+                  block_type: Filter = None,
+                  status: Filter = None,
+                  block_index: Filter = None,
+                  priority: int = 0,
+                  once: bool = False) -> Subscription:
+        """Register a handler; higher priority runs first, equal priority in subscription order"""
+        subscription = Subscription(event, handler, block_type, status, block_index,
+                                    priority, once, next(self._order))
+        subscriptions = self._subscriptions.setdefault(event, [])
+        subscriptions.append(subscription)
+        subscriptions.sort(key=lambda sub: (-sub.priority, sub.order))
+        self._dispatch_tables.pop(event, None)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        """Remove a subscription, returns False if it was not registered"""
+        subscriptions = self._subscriptions.get(subscription.event, [])
+        if subscription not in subscriptions:
+            return False
+        subscriptions.remove(subscription)
+        subscription.active = False
+        self._dispatch_tables.pop(subscription.event, None)
+        return True
+
+    def has_subscribers(self, event: str) -> bool:
+        return bool(self._subscriptions.get(event))
+
+    def resolve(self, event: str, block_type: Any = None, status: Any = None,
+                block_index: Any = None) -> Tuple[Subscription, ...]:
+        """Subscribers of an event matching the given block attributes, in dispatch order"""
+        entry = self._dispatch_tables.get(event)
+        if entry is None:
+            subscriptions = self._subscriptions.get(event, ())
+            filtered = tuple(
+                frozenset().union(*(getattr(subscription, name) or () for subscription in subscriptions))
+                for name in ('block_type', 'status', 'block_index')
+            )
+            entry = self._dispatch_tables[event] = (filtered, {})
+        (types, statuses, indexes), table = entry
+
+        # Any value outside the filters matches exactly the subscribers without that filter
+        key = (block_type if block_type in types else _UNFILTERED,
+               status if status in statuses else _UNFILTERED,
+               block_index if block_index in indexes else _UNFILTERED)
+        matched = table.get(key)
+        if matched is None:
+            matched = tuple(
+                subscription for subscription in self._subscriptions.get(event, ())
+                if subscription.matches(block_type, status, block_index)
+            )
+            table[key] = matched
+        return matched
+
+    def dispatch(self, event: str, *args, block_type: Any = None, status: Any = None,
+                 block_index: Any = None, timeout: Optional[float] = None, **kwargs) -> int:
+        """Start every matching handler (coroutines as tasks), returns how many were started.
+
+        timeout is the deadline in seconds passed to the executor for coroutine handlers.
+        """
+        subscriptions = self.resolve(event, block_type, status, block_index)
+        if not subscriptions:
+            if event not in self._unhandled_logged:
+                self._unhandled_logged.add(event)
+                self.logger.debug("No %s handler registered", event)
+            return 0
+
+        started = 0
+        for subscription in subscriptions:
+            if not subscription.active:
+                continue
+            if subscription.once:
+                self.unsubscribe(subscription)
+            try:
+                result = subscription.handler(*args, **kwargs)
+            except Exception as e:
+                self.logger.error(f"{event} handler {subscription.handler!r} failed: {e}")
+                continue
+            # NON-BLOCKING: Create task instead of awaiting
+            if inspect.isawaitable(result):
+                if self.executor is None:
+                    asyncio.ensure_future(result)
+                else:
+                    name = getattr(subscription.handler, '__qualname__', repr(subscription.handler))
+                    self.executor.submit(result, name, block_index=block_index, timeout=timeout)
+            started += 1
+        return started
@@ -0,0 +1,132 @@
+from typing import Any, Dict, Optional
+
+# Question types whose results carry the chosen/correct choice indices
+_CHOICE_TYPES = ('quiz', 'multiple_select_quiz', 'jumble')
+
+
+class GameBlock:
+    """State of one game block (question), updated in place by its prefetch, start and end events"""
+
+    __slots__ = ('index', 'status', 'content', 'start_time', 'results_content',
+                 'answered', 'answer_sent_at')
+
+    def __init__(self, index: int):
+        self.index = index
+        self.status = "unknown"
+        # Prefetch content and end (result) content, kept as the parsed server objects
+        self.content: Dict[str, Any] = {}
+        self.start_time = 0
+        self.results_content: Optional[Dict[str, Any]] = None
+        self.answered = False
+        self.answer_sent_at = 0.0
+
+    def apply_prefetch(self, content: Dict[str, Any], timetrack) -> None:
+        """Start a new question; nothing of an earlier one at this index is kept"""
+        self.status = "awaiting"
+        self.content = content
+        self.start_time = timetrack
+        self.results_content = None
+        self.answered = False
+        self.answer_sent_at = 0.0
+
+    def apply_start(self, start_time) -> None:
+        self.status = "started"
+        self.start_time = start_time
+
+    def apply_end(self, content: Dict[str, Any]) -> None:
+        self.status = "ended"
+        self.results_content = content
+
+    @property
+    def type(self) -> str:
+        return self.content.get("type", "unknown")
+
+    @property
+    def time_available(self) -> Optional[int]:
+        """Length of the answer window in milliseconds"""
+        return self.content.get("timeAvailable")
+
+    # Result accessors, read from the end event content only when asked for
+
+    def _result(self, key: str, default=None):
+        results = self.results_content
+        if results is None:
+            return default
+        return results.get(key, default)
+
+    @property
+    def points_data(self):
+        return self._result("pointsData")
+
+    @property
+    def has_answer(self):
+        return self._result("hasAnswer")
+
+    @property
+    def skip(self):
+        return self._result("skip")
+
+    @property
+    def points(self):
+        return self._result("points")
+
+    @property
+    def is_correct(self):
+        return self._result("isCorrect")
+
+    @property
+    def rank(self):
+        return self._result("rank")
+
+    @property
+    def total_score(self):
+        return self._result("totalScore")
+
+    @property
+    def correct_answers(self):
+        if self.results_content is None:
+            return None
+        block_type = self.type
+        if block_type in _CHOICE_TYPES:
+            return self._result("correctChoices", [])
+        if block_type == 'open_ended':
+            return self._result("correctTexts", 'N/A')
+        return 'N/A'
+
+    @property
+    def answers(self):
+        if self.results_content is None:
+            return None
+        block_type = self.type
+        if block_type in _CHOICE_TYPES:
+            return self._result("choice", [])
+        if block_type == 'open_ended':
+            return self._result("text", [])
+        return None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The block in the nested dict layout earlier versions kept in gameBlocks"""
+        block = {
+            "status": self.status,
+            "content": self.content,
+            "start_time": self.start_time,
+            "answered": self.answered,
+        }
+        if self.answer_sent_at:
+            block["answer_sent_at"] = self.answer_sent_at
+        if self.results_content is not None:
+            block["results"] = {
+                "content": self.results_content,
+                "pointsData": self.points_data,
+                "hasAnswer": self.has_answer,
+                "skip": self.skip,
+                "points": self.points,
+                "isCorrect": self.is_correct,
+                "correctAnswers": self.correct_answers,
+                "answers": self.answers,
+            }
+        return block
+
+    def __repr__(self) -> str:
+        return (f"GameBlock(index={self.index}, type={self.type!r}, status={self.status!r}, "
+                f"answered={self.answered})")
@@ -0,0 +1,196 @@
+import sys
+import logging
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from ...Context import shared_context
+from .GameBlock import GameBlock
+
+# Stored in the compacted columns when the result did not carry the field
+_MISSING = -1
+
+
+class BlockSummary(NamedTuple):
+    """What is kept of a game block once it has been compacted"""
+    index: int
+    type: str
+    points: Optional[int]
+    isCorrect: Optional[bool]
+    rank: Optional[int]
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    """Approximate memory held by a parsed JSON value"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(key, seen) + _deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class GameBlockStore:
+    """Game blocks of a session with bounded retention.
+
+    The last `keep_full` blocks are kept as full GameBlock objects. Older ones are
+    compacted to a BlockSummary held in array-backed columns, optionally after their
+    full content was appended to `spill_path` as JSON lines. Reads like the dict
+    GameEventHandler used to keep, for the full blocks.
+    """
+
+    def __init__(self, keep_full: Optional[int] = 32, spill_path: Optional[str] = None):
+        # None keeps every block in full, like the plain dict did
+        self.keep_full = keep_full
+        self.spill_path = spill_path
+        self.logger = logging.getLogger(__name__)
+        self._blocks: Dict[int, GameBlock] = {}
+        self._spill_file = None
+        self.spilled = 0
+
+        # Compacted blocks, one row per block across the columns
+        self._types: List[str] = []
+        self._type_codes: Dict[str, int] = {}
+        self._index_column = array('q')
+        self._type_column = array('B')
+        self._points_column = array('q')
+        self._correct_column = array('b')
+        self._rank_column = array('q')
+
+    # Dict interface over the full blocks
+
+    def get(self, index: int, default=None) -> Optional[GameBlock]:
+        return self._blocks.get(index, default)
+
+    def __getitem__(self, index: int) -> GameBlock:
+        return self._blocks[index]
+
+    def __setitem__(self, index: int, block: GameBlock) -> None:
+        replaced = self._blocks.pop(index, None)
+        if replaced is not None and replaced is not block:
+            # An earlier question at the same index (e.g. the host's previous game)
+            self._compact(replaced)
+        self._blocks[index] = block
+        if self.keep_full is not None:
+            while len(self._blocks) > self.keep_full:
+                self._compact(self._blocks.pop(next(iter(self._blocks))))
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._blocks)
+
+    def keys(self):
+        return self._blocks.keys()
+
+    def values(self):
+        return self._blocks.values()
+
+    def items(self):
+        return self._blocks.items()
+
+    # Compaction
+
+    def _compact(self, block: GameBlock) -> None:
+        if self.spill_path:
+            self._spill(block)
+
+        type_code = self._type_codes.get(block.type)
+        if type_code is None:
+            type_code = self._type_codes[block.type] = len(self._types)
+            self._types.append(block.type)
+
+        points = block.points
+        is_correct = block.is_correct
+        rank = block.rank
+        self._index_column.append(block.index)
+        self._type_column.append(type_code)
+        self._points_column.append(points if isinstance(points, int) else _MISSING)
+        self._correct_column.append(_MISSING if is_correct is None else int(bool(is_correct)))
+        self._rank_column.append(rank if isinstance(rank, int) else _MISSING)
+
+    def _spill(self, block: GameBlock) -> None:
+        try:
+            if self._spill_file is None:
+                self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+            record = {"index": block.index, "status": block.status, "content": block.content,
+                      "results": block.results_content}
+            self._spill_file.write(shared_context.codec.dumps(record) + "\n")
+            self._spill_file.flush()
+            self.spilled += 1
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.warning(f"Failed to spill block {block.index}: {e}")
+
+    def _summary(self, row: int) -> BlockSummary:
+        points = self._points_column[row]
+        is_correct = self._correct_column[row]
+        rank = self._rank_column[row]
+        return BlockSummary(
+            self._index_column[row],
+            self._types[self._type_column[row]],
+            None if points == _MISSING else points,
+            None if is_correct == _MISSING else bool(is_correct),
+            None if rank == _MISSING else rank,
+        )
+
+    @property
+    def compacted(self) -> int:
+        return len(self._index_column)
+
+    def summaries(self) -> Iterator[BlockSummary]:
+        """Summaries of every block, compacted ones first, in the order they were seen"""
+        for row in range(len(self._index_column)):
+            yield self._summary(row)
+        for block in self._blocks.values():
+            is_correct = block.is_correct
+            yield BlockSummary(block.index, block.type, block.points,
+                               None if is_correct is None else bool(is_correct), block.rank)
+
+    def summary(self, index: int) -> Optional[BlockSummary]:
+        """Summary of a block, the most recent one if the index was seen more than once"""
+        block = self._blocks.get(index)
+        if block is not None:
+            is_correct = block.is_correct
+            return BlockSummary(block.index, block.type, block.points,
+                                None if is_correct is None else bool(is_correct), block.rank)
+        for row in range(len(self._index_column) - 1, -1, -1):
+            if self._index_column[row] == index:
+                return self._summary(row)
+        return None
+
+    def clear(self) -> None:
+        self._blocks.clear()
+        for column in (self._index_column, self._type_column, self._points_column,
+                       self._correct_column, self._rank_column):
+            del column[:]
+
+    def close(self) -> None:
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate memory held by the store, in bytes"""
+        seen = set()
+        full_bytes = sum(
+            sys.getsizeof(block) + _deep_sizeof(block.content, seen) + _deep_sizeof(block.results_content, seen)
+            for block in self._blocks.values()
+        )
+        column_bytes = sum(
+            column.buffer_info()[1] * column.itemsize
+            for column in (self._index_column, self._type_column, self._points_column,
+                           self._correct_column, self._rank_column)
+        )
+        return {
+            "full_blocks": len(self._blocks),
+            "compacted_blocks": self.compacted,
+            "spilled_blocks": self.spilled,
+            "full_bytes": full_bytes,
+            "compacted_bytes": column_bytes,
+            "total_bytes": full_bytes + column_bytes,
+        }
@@ -1,80 +1,111 @@
-import json
+import time
 import asyncio
 import logging
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, Optional, Union
 from ...Context import shared_context
+from ...EventLog import EventLogger
 from .BlockContext import BlockContext
+from .GameBlock import GameBlock
+from .GameBlockStore import GameBlockStore
+from .EventBus import EventBus, Subscription
+from .HandlerExecutor import HandlerExecutor
 from ...Packets.Messages.PacketFactory import PacketFactory
+from ...Packets.Messages.ParsedMessage import ParsedMessage
 
 class GameEventHandler:
-    def __init__(self):
-        self.event_handlers = {
-            'onGameBlockUpdate': None,
-            'onLeaderboard': None,
-            'onGameOver': None
-        }
+    def __init__(self, max_handler_concurrency: int = 32, deadline_grace: float = 1.0,
+                 keep_full_blocks: Optional[int] = 32, block_spill_path: Optional[str] = None):
+        self.executor = HandlerExecutor(max_concurrency=max_handler_concurrency)
+        self.event_bus = EventBus(self.executor)
+        # Handlers of a started question may run this long past its deadline
+        self.deadline_grace = deadline_grace
         self.logger = logging.getLogger(__name__)
-        self.gameBlocks = {}
+        self.event_log = EventLogger(__name__)
+        # The last keep_full_blocks blocks are kept whole, older ones as summaries
+        self.gameBlocks = GameBlockStore(keep_full_blocks, block_spill_path)
         self.lastBlockIndex = 0
+        # Pre-serialized answers staged during the awaiting phase, keyed by block index
+        self.staged_answers = {}
 
-    def on_gameBlockUpdate(self, handler: Callable):
-        self.event_handlers['onGameBlockUpdate'] = handler
+    def subscribe(self, event_name: str, handler: Callable, **filters) -> Subscription:
+        """Add a handler for an event; filters are block_type, status, block_index, priority and once"""
+        return self.event_bus.subscribe(event_name, handler, **filters)
 
-    def on_leaderboard(self, handler: Callable):
-        self.event_handlers['onLeaderboard'] = handler
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        return self.event_bus.unsubscribe(subscription)
 
-    def on_gameOver(self, handler: Callable):
-        self.event_handlers['onGameOver'] = handler
+    def on_gameBlockUpdate(self, handler: Callable, **filters) -> Subscription:
+        return self.subscribe('onGameBlockUpdate', handler, **filters)
 
-    async def handle_packet(self, packet: Optional[Dict[str, Any]]) -> None:
+    def on_leaderboard(self, handler: Callable, **filters) -> Subscription:
+        return self.subscribe('onLeaderboard', handler, **filters)
+
+    def on_gameOver(self, handler: Callable, **filters) -> Subscription:
+        return self.subscribe('onGameOver', handler, **filters)
+
+    async def handle_packet(self, packet: Optional[Union[ParsedMessage, Dict[str, Any]]]) -> None:
         """Handle incoming game packet - handles None case"""
         if packet is None:
             return
-            
-        if not isinstance(packet, dict):
+
+        if isinstance(packet, dict):
+            packet = ParsedMessage(packet)
+        elif not isinstance(packet, ParsedMessage):
             self.logger.error(f"Received non-dict packet: {type(packet)} - {packet}")
             return
             
         try:
-            if packet == None:
-                return
-            channel = packet.get('channel', '')
-            
-            # DEBUG: Log all packets to see what we're receiving
-            self.logger.debug(f"Handling packet on channel: {channel}")
+            channel = packet.channel
             
             if channel == '/service/player':
                 await self._handle_game_event(packet)
             elif channel == '/meta/connect':
                 await self._handle_heartbeat(packet)
             elif channel == '/service/controller':
-                self.logger.debug(f"Controller packet: {packet.get('id', 'unknown')}")
+                self.event_log.debug("packet.other", "Controller packet: %s", packet.get('id', 'unknown'))
             elif channel == '/service/status':
-                self.logger.debug(f"Status packet: {packet.get('data', {})}")
+                self.event_log.debug("packet.other", "Status packet: %s", packet.data)
             else:
-                self.logger.debug(f"Ignoring packet on channel: {channel}")
+                self.event_log.debug("packet.other", "Ignoring packet on channel: %s", channel)
 
         except Exception as e:
-            self.logger.error(f"Error handling packet: {e} | Packet: {packet}")
+            self.logger.error("Error handling packet: %s | Packet: %s", e, packet)
 
     def _call_event_handler(self, event_name, *args, **kwargs):
-        handler = self.event_handlers.get(event_name)
-        if handler:
-            # NON-BLOCKING: Create task instead of awaiting
-            asyncio.create_task(handler(*args, **kwargs))
-        else:
-            self.logger.warning(f"No {event_name} handler registered!")
-
-    async def _handle_game_event(self, packet: Dict[str, Any]) -> None:
+        ctx = args[0] if args and isinstance(args[0], BlockContext) else None
+        if ctx is None:
+            self.event_bus.dispatch(event_name, *args, **kwargs)
+            return
+        self.event_bus.dispatch(event_name, *args, block_type=ctx.type, status=ctx.status,
+                                block_index=ctx.index, timeout=self._handler_timeout(ctx), **kwargs)
+
+    def _handler_timeout(self, ctx: BlockContext) -> Optional[float]:
+        """Deadline for handlers of a block: its answer window while running, none otherwise"""
+        if ctx.status != "started":
+            return None
+        time_left = ctx.time_left()
+        if time_left is None:
+            time_available = ctx.time_available
+            if time_available is None:
+                return None
+            time_left = time_available / 1000
+        return time_left + self.deadline_grace
+
+    async def _handle_game_event(self, packet: ParsedMessage) -> None:
         """Handle game event from /service/player channel"""
-        data = packet.get('data', {})
+        data = packet.data
         if not data:
             return
-            
-        content_str = data.get('content', '{}')
+
+        content = packet.content
+        if packet.content_error is not None:
+            self.logger.warning("Failed to parse game event content: %s", packet.content_error)
+            return
+        if not isinstance(content, dict):
+            self.logger.debug("Game event without content object: %s", packet.raw_content)
+            return
 
         try:
-            content = json.loads(content_str)
             gameBlockIndex = content.get('gameBlockIndex')
             if gameBlockIndex is None:
                 self.logger.debug("Game event missing gameBlockIndex")
@@ -82,100 +113,83 @@ class GameEventHandler:
             else:
                 self.lastBlockIndex = gameBlockIndex
             
-            # Initialize game block if not exists
-            if gameBlockIndex not in self.gameBlocks:
-                self.gameBlocks[gameBlockIndex] = {
-                    "status": "unknown",
-                    "content": {},
-                    "start_time": 0
-                }
-                
-            gameBlock = self.gameBlocks[gameBlockIndex]
+            # Blocks are created on first sight and updated in place afterwards; a prefetch
+            # for an index that already ended is a new question (e.g. the host's next game)
+            gameBlock = self.gameBlocks.get(gameBlockIndex)
+            if gameBlock is None or (data["id"] == 1 and gameBlock.status == "ended"):
+                gameBlock = self.gameBlocks[gameBlockIndex] = GameBlock(gameBlockIndex)
 
             if data["id"] == 1:  # prefetch
-                gameBlock["status"] = "awaiting"
-                gameBlock["content"] = content
-                gameBlock["start_time"] = packet["ext"]["timetrack"]  # 1761568243975
+                gameBlock.apply_prefetch(content, packet["ext"]["timetrack"])  # 1761568243975
 
-                self.logger.info(f"🕒 [Block {gameBlockIndex}] Prefetch received at {packet['ext']['timetrack']}")
-                self.logger.info(f"❓ Question detected: {content.get('type')} | Title: {content.get('title', 'N/A')}")
-                self.logger.debug(f"[Block {gameBlockIndex}] Full content data: {content}")
+                self.event_log.info("block.prefetch", "🕒 [Block %s] Prefetch received at %s | ❓ %s | Title: %s",
+                                    gameBlockIndex, gameBlock.start_time, content.get('type'), content.get('title', 'N/A'),
+                                    block=gameBlockIndex, type=content.get('type'))
+                self.event_log.debug("block.dump", "[Block %s] Full content data: %s", gameBlockIndex, content)
 
             elif data["id"] == 2:  # start
-                gameBlock["status"] = "started"
-                self.logger.info(f"🚀 [Block {gameBlockIndex}] Question started.")
-                self.logger.debug(f"[Block {gameBlockIndex}] Current block data: {gameBlock}")
-
-            elif data["id"] == 8:  # end + result
-                gameBlock["status"] = "ended"
-
-                if "results" not in gameBlock:
-                    gameBlock["results"] = {}
-                    self.logger.debug(f"[Block {gameBlockIndex}] Created empty results dict.")
+                gameBlock.status = "started"
 
-                gameBlock["results"]["content"] = content
+                # Staged answer goes out first, before anything else runs for this event
+                staged = self.staged_answers.pop(gameBlockIndex, None)
+                if staged is not None and not gameBlock.answered:
+                    await self._send_staged_answer(gameBlockIndex, gameBlock, staged, packet.received_at)
 
-                # Merge all info from content into results
-                gameBlock["results"].update({
-                    "pointsData": content.get("pointsData"),
-                    "hasAnswer": content.get("hasAnswer"),
-                    "skip": content.get("skip"),
-                    "points": content.get("points"),
-                    "isCorrect": content.get("isCorrect"),
-                })
+                # Server time the answer window opened, the base of BlockContext.deadline
+                gameBlock.apply_start((packet.get("ext") or {}).get("timetrack") or shared_context.clock.server_time_ms())
+                self.event_log.info("block.start", "🚀 [Block %s] Question started.", gameBlockIndex, block=gameBlockIndex)
+                self.event_log.debug("block.dump", "[Block %s] Current block data: %s", gameBlockIndex, gameBlock)
 
-                self.logger.debug(f"gameBlock DATA:\n{gameBlock}\n\n\n\n\n")
+            elif data["id"] == 8:  # end + result
+                gameBlock.apply_end(content)
+                self.staged_answers.pop(gameBlockIndex, None)
+                # Handlers still working on this question can no longer answer it
+                self.executor.cancel_block(gameBlockIndex)
 
                 shared_context.rank = content.get("rank", shared_context.rank)
                 shared_context.score = content.get("totalScore", shared_context.score)
 
-                self.logger.info(f"🏁 [Block {gameBlockIndex}] Question ended. "
-                                f"Score: {shared_context.score}, Rank: {shared_context.rank}")
-                self.logger.debug(f"[Block {gameBlockIndex}] Raw result content: {content}")
-
-                gameBlockType = (gameBlock.get("content") or {}).get("type", "unknown")
+                self.event_log.info("block.end", "🏁 [Block %s] Question ended. Score: %s, Rank: %s",
+                                    gameBlockIndex, shared_context.score, shared_context.rank,
+                                    block=gameBlockIndex, score=shared_context.score, rank=shared_context.rank)
+                self.event_log.debug("block.dump", "[Block %s] Raw result content: %s", gameBlockIndex, content)
 
+                gameBlockType = gameBlock.type
                 if gameBlockType in ['quiz', 'multiple_select_quiz', 'jumble']:
-                    gameBlock["results"]["correctAnswers"] = (
-                        gameBlock.get('results', {}).get('content', {}).get('correctChoices', [])
-                    )
-
-                    gameBlock["results"]["answers"] = (
-                        gameBlock.get('results', {}).get('content', {}).get('choice', [])
-                    )
-                    
-                    self.logger.info(f"✅ [Block {gameBlockIndex}] Correct answers (quiz): "
-                                    f"{gameBlock['results']['correctAnswers']}")
+                    self.logger.info("✅ [Block %s] Correct answers (quiz): %s", gameBlockIndex, gameBlock.correct_answers)
                 elif gameBlockType == 'open_ended':
-                    gameBlock["results"]["correctAnswers"] = (
-                        gameBlock.get('results', {}).get('content', {}).get('correctTexts', 'N/A')
-                    )
-
-                    gameBlock["results"]["answers"] = (
-                        gameBlock.get('results', {}).get('content', {}).get('text', [])
-                    )
-
-                    self.logger.info(f"🗒️ [Block {gameBlockIndex}] Correct answers (open-ended): "
-                                    f"{gameBlock['results']['correctAnswers']}")
+                    self.logger.info("🗒️ [Block %s] Correct answers (open-ended): %s",
+                                     gameBlockIndex, gameBlock.correct_answers)
                 else:
-                    gameBlock["results"]["correctAnswers"] = 'N/A'
-                    self.logger.warning(f"⚠️ [Block {gameBlockIndex}] Unknown question type: {gameBlockType}")
-
-                self.logger.debug(f"[Block {gameBlockIndex}] Final gameBlock data: {gameBlock}")
-
-            ctx = BlockContext(gameBlockIndex, gameBlock)
-            self.logger.debug(f"📡 Dispatching event 'onGameBlockUpdate' for block {gameBlockIndex}.")
+                    self.logger.warning("⚠️ [Block %s] Unknown question type: %s", gameBlockIndex, gameBlockType)
+
+            ctx = BlockContext(gameBlockIndex, gameBlock, packet)
+            self.event_log.debug("block.dispatch", "📡 Dispatching event 'onGameBlockUpdate' for block %s.",
+                                 gameBlockIndex, block=gameBlockIndex)
+            ctx.dispatched_at = time.perf_counter()
+            if ctx.received_at:
+                shared_context.metrics.dispatch_latency.observe(ctx.dispatched_at - ctx.received_at)
             self._call_event_handler('onGameBlockUpdate', ctx)
 
 
-        except json.JSONDecodeError as e:
-            self.logger.warning(f"Failed to parse game event content: {e}")
+        except KeyError as e:
+            self.logger.warning(f"Game event missing field: {e}")
 
-    async def _handle_heartbeat(self, packet: Dict[str, Any]) -> None:
-        """Handle heartbeat packet - CRITICAL: This must respond to keep connection alive"""
-        self.logger.debug(f"💓 Received heartbeat with ack: {packet.get('ext', {}).get('ack')}")
-        
-        # Send acknowledgement back to server
-        ack_packet = PacketFactory.create_acknowledgement()
-        await shared_context.websocket_client.send_packet(ack_packet)
-        self.logger.debug(f"💓 Sent heartbeat ack: {ack_packet['ext']['ack']}")
\ No newline at end of file
+    async def _send_staged_answer(self, gameBlockIndex: int, gameBlock: GameBlock, staged,
+                                  received_at: float = 0.0) -> None:
+        """Send an answer staged with BlockContext.stage_answer"""
+        try:
+            await shared_context.websocket_client.send_answer(PacketFactory.encode_staged(staged))
+        except Exception as e:
+            self.logger.error(f"❌ [Block {gameBlockIndex}] Failed to send staged answer: {e}")
+            return
+        gameBlock.answered = True
+        gameBlock.answer_sent_at = time.perf_counter()
+        if received_at:
+            shared_context.metrics.answer_latency.observe(gameBlock.answer_sent_at - received_at)
+        self.event_log.info("answer.sent", "⚡ [Block %s] Sent staged answer on start", gameBlockIndex,
+                            block=gameBlockIndex, staged=True)
+
+    async def _handle_heartbeat(self, packet: ParsedMessage) -> None:
+        """Log a heartbeat reply; the WebSocketClient's HeartbeatScheduler sends the next connect"""
+        self.event_log.debug("heartbeat.reply", "💓 Received heartbeat with ack: %s", (packet.get('ext') or {}).get('ack'))
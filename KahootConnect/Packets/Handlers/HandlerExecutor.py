@@ -0,0 +1,148 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional, Set
+from ...Context import shared_context
+
+class HandlerStats:
+    """Timings and outcomes of one event handler"""
+
+    __slots__ = ('calls', 'failures', 'timeouts', 'cancelled', 'total_time', 'max_time')
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "avg_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_time * 1000,
+        }
+
+class HandlerExecutor:
+    """Runs event handler coroutines as tracked tasks.
+
+    Tasks are kept until they finish (so they cannot be garbage-collected mid-flight), at
+    most `max_concurrency` handlers run at once, each can carry a deadline, and the tasks
+    of a game block can be cancelled together once the block has ended. A deadline runs
+    from submit(), so time spent waiting for a free slot counts against it.
+    """
+
+    def __init__(self, max_concurrency: int = 32, default_timeout: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.logger = logging.getLogger(__name__)
+        self._semaphore = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._block_tasks: Dict[int, Set[asyncio.Task]] = {}
+        self.stats: Dict[str, HandlerStats] = {}
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, coroutine: Awaitable, name: str, block_index: Optional[int] = None,
+               timeout: Optional[float] = None) -> asyncio.Task:
+        """Schedule a handler coroutine, optionally bound to a block and a deadline in seconds"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if timeout is None:
+            timeout = self.default_timeout
+        # Absolute, so that queueing behind max_concurrency counts against it
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + max(timeout, 0.0)
+        task = asyncio.ensure_future(self._run(coroutine, name, timeout, deadline))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        if block_index is not None:
+            block_tasks = self._block_tasks.setdefault(block_index, set())
+            block_tasks.add(task)
+            task.add_done_callback(lambda done: self._forget(block_index, done))
+        return task
+
+    def _forget(self, block_index: int, task: asyncio.Task) -> None:
+        block_tasks = self._block_tasks.get(block_index)
+        if block_tasks is not None:
+            block_tasks.discard(task)
+            if not block_tasks:
+                del self._block_tasks[block_index]
+
+    async def _run(self, coroutine: Awaitable, name: str, timeout: Optional[float],
+                   deadline: Optional[float]) -> None:
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats()
+
+        started = time.perf_counter()
+        semaphore = self._semaphore
+        acquired = False
+        try:
+            if deadline is None:
+                await semaphore.acquire()
+                acquired = True
+                await coroutine
+            else:
+                loop = asyncio.get_running_loop()
+                await asyncio.wait_for(semaphore.acquire(), max(deadline - loop.time(), 0.0))
+                acquired = True
+                await asyncio.wait_for(coroutine, max(deadline - loop.time(), 0.0))
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            shared_context.metrics.handler_failures.inc(1, name)
+            self.logger.warning(f"⏱️ Handler {name} cancelled after its {timeout:.2f}s deadline")
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            self.logger.debug("Handler %s cancelled", name)
+        except Exception as e:
+            stats.failures += 1
+            shared_context.metrics.handler_failures.inc(1, name)
+            self.logger.error(f"❌ Handler {name} failed: {e}", exc_info=True)
+        finally:
+            if acquired:
+                semaphore.release()
+            if asyncio.iscoroutine(coroutine):
+                # Never awaited when cancelled while waiting for the semaphore
+                coroutine.close()
+            elapsed = time.perf_counter() - started
+            stats.calls += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+
+    def cancel_block(self, block_index: int) -> int:
+        """Cancel the handlers still running for a block, returns how many were cancelled"""
+        tasks = self._block_tasks.pop(block_index, ())
+        cancelled = 0
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+        if cancelled:
+            self.logger.info(f"🧹 [Block {block_index}] Cancelled {cancelled} stale handler(s)")
+        return cancelled
+
+    async def shutdown(self) -> None:
+        """Cancel every running handler and wait for them to finish"""
+        # A handler may be the one shutting down, it must not wait for itself
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._block_tasks.clear()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "handlers": {name: stats.as_dict() for name, stats in self.stats.items()},
+        }
@@ -1,101 +1,228 @@
+import time
 import logging
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
 from ...Packets.Messages.PacketFactory import PacketFactory
+from ...Packets.Messages.ParsedMessage import ParsedMessage
+from ...Protocol.Events import PLAYER_DATA_ID, GAME_DATA_ID
 from ...Context import shared_context
 
+# Join states in order; each one waits for the message that ends it
+JOIN_STATES = ("handshake", "connect", "login", "ready", "status", "player_data")
+
+# Seconds each state may wait for its message
+DEFAULT_STATE_TIMEOUTS = {
+    "handshake": 5.0,
+    "connect": 5.0,
+    "login": 10.0,
+    "ready": 5.0,
+    "status": 5.0,
+    "player_data": 5.0,
+}
+
+# Without these the player is still in the game, so a timeout only ends the join early
+_OPTIONAL_STATES = ("status", "player_data")
+
+def _is_reply(packet: ParsedMessage) -> bool:
+    """A /meta/connect reply or the reply to a controller message we sent"""
+    return packet.channel == '/meta/connect' or (packet.channel == '/service/controller' and 'successful' in packet)
+
 class HandshakeHandler:
-    def __init__(self):
+    """Joins a game as a state machine driven by the received messages.
+
+    handshake -> connect -> login (cid) -> ready -> status -> player_data, each state
+    ending on the message it waits for and failing after its own timeout. Messages are
+    looked at in whatever order they arrive: the status, player data and game data
+    packets are kept in `join_packets` whenever they show up, and everything else the
+    join does not consume is buffered for the listen loop (see take_pending_packets).
+    The time spent in each state is kept in `state_timings`.
+    """
+
+    def __init__(self, state_timeouts: Optional[Dict[str, float]] = None):
         self.logger = logging.getLogger(__name__)
+        self.pending_packets = deque()
+        self.state_timeouts = dict(DEFAULT_STATE_TIMEOUTS)
+        if state_timeouts:
+            self.state_timeouts.update(state_timeouts)
+        self.state = "idle"
+        # Milliseconds spent in each state of the last join or resume
+        self.state_timings: Dict[str, float] = {}
+        # "status", "player_data" and "game_data" messages of the last join
+        self.join_packets: Dict[str, ParsedMessage] = {}
+        self._state_started = 0.0
+
+    @property
+    def player_data(self) -> Optional[Dict[str, Any]]:
+        packet = self.join_packets.get("player_data")
+        return packet.content if packet is not None else None
+
+    @property
+    def game_data(self) -> Optional[Dict[str, Any]]:
+        packet = self.join_packets.get("game_data")
+        return packet.content if packet is not None else None
+
+    def take_pending_packets(self) -> List[ParsedMessage]:
+        """Return messages received during the handshake that it did not consume"""
+        packets = list(self.pending_packets)
+        self.pending_packets.clear()
+        return packets
 
-    async def perform_handshake(self) -> str:
-        """Perform WebSocket handshake and return client ID"""
+    def observe_join_packet(self, packet: ParsedMessage) -> bool:
+        """Keep the status, player data or game data message; True if it was one of them"""
+        if packet.channel == '/service/status':
+            self.join_packets["status"] = packet
+            return True
+        if packet.channel == '/service/player':
+            data_id = packet.data.get('id')
+            if data_id == PLAYER_DATA_ID:
+                self.join_packets["player_data"] = packet
+                return True
+            if data_id == GAME_DATA_ID:
+                self.join_packets["game_data"] = packet
+                return True
+        return False
+
+    def _enter(self, state: str) -> None:
+        now = time.perf_counter()
+        if self.state in self.state_timeouts:
+            self.state_timings[self.state] = (now - self._state_started) * 1000
+        self.logger.debug("Handshake state: %s -> %s", self.state, state)
+        self.state = state
+        self._state_started = now
+
+    async def _expect(self, matches: Callable[[ParsedMessage], bool]) -> Optional[ParsedMessage]:
+        """Wait for the message ending the current state, None once its timeout passed.
+
+        Join packets are kept as they pass, replies to what we sent are consumed (the
+        WebSocketClient already handled the /meta/connect ones), and anything else is
+        buffered for the listen loop.
+        """
+        websocket_client = shared_context.websocket_client
+        deadline = self._state_started + self.state_timeouts[self.state]
+        skipped = []
+        try:
+            while True:
+                while self.pending_packets:
+                    packet = self.pending_packets.popleft()
+                    kept = self.observe_join_packet(packet)
+                    if matches(packet):
+                        return packet
+                    if not kept and not _is_reply(packet):
+                        skipped.append(packet)
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                packets = await websocket_client.receive_packets(timeout=remaining)
+                if not packets and websocket_client.reader_task and websocket_client.reader_task.done():
+                    raise ConnectionError(f"Connection closed during the {self.state} state")
+                self.pending_packets.extend(packets)
+        finally:
+            self.pending_packets.extendleft(reversed(skipped))
+
+    async def _require(self, matches: Callable[[ParsedMessage], bool]) -> ParsedMessage:
+        packet = await self._expect(matches)
+        if packet is None:
+            raise ConnectionError(f"Timed out in the {self.state} state after {self.state_timeouts[self.state]:.1f}s")
+        return packet
+
+    async def perform_handshake(self, relogin_cid=None) -> str:
+        """Perform WebSocket handshake and return client ID.
+
+        With relogin_cid the player rejoins a running game under that cid instead of
+        logging in again, and the join sequence after the login is skipped.
+        """
+        websocket_client = shared_context.websocket_client
         # Reset counters
-        shared_context.message_counter = 1
-        shared_context.ack_counter = 0
-        
+        shared_context.protocol.reset()
+        self.pending_packets.clear()
+        self.state = "idle"
+        self.state_timings = {}
+        if not relogin_cid:
+            self.join_packets = {}
+
         # Send handshake
-        await shared_context.websocket_client.send_packet(PacketFactory.create_handshake_request())
-        handshake_response = await shared_context.websocket_client.receive_packet()
-        
-        if not handshake_response or not handshake_response.get('successful'):
+        self._enter("handshake")
+        await websocket_client.send_packet(PacketFactory.create_handshake_request())
+        handshake_response = await self._require(lambda packet: packet.channel == '/meta/handshake')
+        if not handshake_response.get('successful'):
             raise ConnectionError("Handshake failed")
-            
-        shared_context.client_id = handshake_response.get('clientId', '')
-        if not shared_context.client_id:
+
+        # The protocol took the client ID (and below the ack and cid) from the replies
+        if not handshake_response.get('clientId'):
             raise ConnectionError("Failed to receive client ID during handshake")
-            
         self.logger.info(f"Received client ID: {shared_context.client_id}")
 
         # Send initial connect (ack: 0)
-        await shared_context.websocket_client.send_packet(PacketFactory.create_initial_connect())
-        connect_response = await shared_context.websocket_client.receive_packet()
-        
-        if not connect_response or not connect_response.get('successful'):
+        self._enter("connect")
+        await websocket_client.send_packet(PacketFactory.create_initial_connect())
+        connect_response = await self._require(lambda packet: packet.channel == '/meta/connect')
+        if not connect_response.get('successful'):
             raise ConnectionError("Initial connect failed")
-            
-        # Update ack counter based on response
-        shared_context.ack_counter = connect_response.get('ext', {}).get('ack', 0) + 1
-        
-        # Send connect with ack: 1
-        await shared_context.websocket_client.send_packet(
-            PacketFactory.create_connect(shared_context.ack_counter)
-        )
-        
-        # Send login request
-        await shared_context.websocket_client.send_packet(PacketFactory.create_login_request())
-
-        # Wait for login response with CID
-        login_response = None
-        for _ in range(10):
-            response = await shared_context.websocket_client.receive_packet()
-            if response and response.get('data', {}).get('cid'):
-                login_response = response
-                break
-            elif response and response.get('channel') == '/meta/connect':
-                # Update ack for connect messages
-                ack_value = response.get('ext', {}).get('ack', 0)
-                shared_context.ack_counter = ack_value + 1
-
-        if not login_response or not login_response.get('data', {}).get('cid'):
-            raise ConnectionError("Failed to receive CID during login")
-
-        shared_context.cid = login_response['data']['cid']
+
+        # Send connect with ack: 1; from here on the scheduler sends every /meta/connect
+        await websocket_client.send_packet(PacketFactory.create_connect(shared_context.ack_counter))
+        websocket_client.heartbeat.start()
+
+        # Send login request and wait for the login response with the CID
+        self._enter("login")
+        if relogin_cid:
+            await websocket_client.send_packet(PacketFactory.create_relogin_request(relogin_cid))
+        else:
+            await websocket_client.send_packet(PacketFactory.create_login_request())
+        await self._require(lambda packet: packet.channel == '/service/controller' and bool(packet.data.get('cid')))
         self.logger.info(f"Received CID: {shared_context.cid}")
 
-        # Send client ready
-        await shared_context.websocket_client.send_packet(PacketFactory.create_client_ready())
-
-        for _ in range(5):
-            response = await shared_context.websocket_client.receive_packet()
-            if response and response.get('channel', {}) == '/service/controller': # ack after all messages
-                await shared_context.websocket_client.send_packet(PacketFactory.create_acknowledgement())
-                break
-
-        for _ in range(5):
-            response = await shared_context.websocket_client.receive_packet()
-            if response and response.get('channel', {}) == '/service/status':
-                if response.get('data', {}).get('status') != 'ACTIVE':
-                    raise ConnectionError("Game status is not ACTIVE")
-            elif response and response.get('channel') == '/meta/connect': # ack after all messages
-                await shared_context.websocket_client.send_packet(PacketFactory.create_acknowledgement())
-                break
-
-        for _ in range(5):
-            response = await shared_context.websocket_client.receive_packet()
-            if response and response.get('channel', {}) == '/service/player':
-                playerDataPacket = response
-                self.logger.debug("Got player data!")
-            elif response and response.get('channel') == '/meta/connect': # ack after all messages
-                await shared_context.websocket_client.send_packet(PacketFactory.create_acknowledgement())
-                break
-
-        for _ in range(5):
-            response = await shared_context.websocket_client.receive_packet()
-            if response and response.get('channel', {}) == '/service/player':
-                gameDataPacket = response
-                self.logger.debug("Got game data!")
-            elif response and response.get('channel') == '/meta/connect': # ack after all messages
-                await shared_context.websocket_client.send_packet(PacketFactory.create_acknowledgement())
-                break
+        if relogin_cid:
+            # The game is already running, its events arrive on the listen loop
+            self._enter("joined")
+            self.logger.info("Relogin completed successfully")
+            return shared_context.client_id
+
+        # Send client ready and wait for its reply
+        self._enter("ready")
+        client_ready = PacketFactory.create_client_ready()
+        await websocket_client.send_packet(client_ready)
+        await self._require(lambda packet: packet.channel == '/service/controller'
+                            and packet.get('id') == client_ready['id'])
+
+        # Either may already have arrived, in any order
+        for state in _OPTIONAL_STATES:
+            self._enter(state)
+            if await self._expect(lambda packet: state in self.join_packets) is None:
+                self.logger.warning(f"No {state} message within {self.state_timeouts[state]:.1f}s, continuing")
+
+        status = self.join_packets.get("status")
+        if status is not None and status.data.get('status') != 'ACTIVE':
+            raise ConnectionError("Game status is not ACTIVE")
 
+        self._enter("joined")
         self.logger.info("Handshake completed successfully")
-        return shared_context.client_id
\ No newline at end of file
+        return shared_context.client_id
+
+    async def perform_resume(self) -> bool:
+        """Attach the existing client ID to a new WebSocket; False if the server no longer knows it"""
+        self.pending_packets.clear()
+        self.state = "idle"
+        self.state_timings = {}
+
+        # Immediate connect carrying the last ack, so the server redelivers what we missed
+        self._enter("connect")
+        await shared_context.websocket_client.send_packet(
+            PacketFactory.create_initial_connect(shared_context.ack_counter)
+        )
+        response = await self._expect(lambda packet: packet.channel == '/meta/connect')
+        if response is None:
+            return False
+        if not response.get('successful'):
+            self.logger.info(f"Session resume rejected: {response.get('error')}")
+            return False
+
+        # Restart the long poll; messages that came with the reply go to the listen loop
+        await shared_context.websocket_client.send_packet(
+            PacketFactory.create_connect(shared_context.ack_counter)
+        )
+        shared_context.websocket_client.heartbeat.start()
+        self._enter("joined")
+        self.logger.info(f"Resumed session of client ID: {shared_context.client_id}")
+        return True
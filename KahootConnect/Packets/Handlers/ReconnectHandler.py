@@ -0,0 +1,217 @@
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ...Context import shared_context
+from ..Messages.PacketFactory import PacketFactory
+from .BlockContext import BlockContext
+from .HandshakeHandler import HandshakeHandler
+
+class ReconnectStats:
+    """Counters and time-to-recover of the reconnects of a client"""
+
+    __slots__ = ('disconnects', 'attempts', 'resumes', 'relogins', 'failures', 'missed_heartbeats',
+                 'answers_replayed', 'answers_dropped', 'last_recovery_time', 'total_recovery_time',
+                 'max_recovery_time')
+
+    def __init__(self):
+        self.disconnects = 0
+        self.attempts = 0
+        self.resumes = 0
+        self.relogins = 0
+        self.failures = 0
+        self.missed_heartbeats = 0
+        self.answers_replayed = 0
+        self.answers_dropped = 0
+        self.last_recovery_time = 0.0
+        self.total_recovery_time = 0.0
+        self.max_recovery_time = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        recoveries = self.resumes + self.relogins
+        return {
+            "disconnects": self.disconnects,
+            "attempts": self.attempts,
+            "resumes": self.resumes,
+            "relogins": self.relogins,
+            "failures": self.failures,
+            "missed_heartbeats": self.missed_heartbeats,
+            "answers_replayed": self.answers_replayed,
+            "answers_dropped": self.answers_dropped,
+            "last_recovery_ms": self.last_recovery_time * 1000,
+            "avg_recovery_ms": self.total_recovery_time / recoveries * 1000 if recoveries else 0.0,
+            "max_recovery_ms": self.max_recovery_time * 1000,
+        }
+
+class ReconnectHandler:
+    """Brings a lost connection back without losing the player.
+
+    The Bayeux session is first resumed on a new WebSocket with the existing client ID.
+    If the server no longer knows it, the client logs in again under its cid (relogin)
+    on a fresh session. Failed attempts are retried with jittered exponential backoff.
+    Answers given while the connection was down are queued; the listen loop replays them
+    once it has handled the messages the server redelivered on the new connection.
+    A watchdog drops the connection when no frame (not even a held /meta/connect reply)
+    arrived for `liveness_timeout` seconds.
+    """
+
+    def __init__(self,
+                 handshake_handler: HandshakeHandler,
+                 open_connection: Callable[[], Awaitable[bool]],
+                 enabled: bool = True,
+                 max_attempts: int = 8,
+                 base_delay: float = 0.25,
+                 max_delay: float = 10.0,
+                 liveness_timeout: Optional[float] = 45.0):
+        self.handshake_handler = handshake_handler
+        # Fetches a new session and opens the WebSocket for it, as KahootClient.connect does
+        self.open_connection = open_connection
+        self.enabled = enabled
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.liveness_timeout = liveness_timeout
+        self.logger = logging.getLogger(__name__)
+        self.reconnecting = False
+        # Answers that could not be sent, keyed by block index: (question type, answer)
+        self.pending_answers: "OrderedDict[int, tuple]" = OrderedDict()
+        self.stats = ReconnectStats()
+        self._lock = None
+        self._watchdog_task = None
+
+    def start(self) -> None:
+        """Start watching the connection for missed heartbeats"""
+        if self.enabled and self.liveness_timeout and self._watchdog_task is None:
+            self._watchdog_task = asyncio.create_task(self._watchdog())
+
+    async def stop(self) -> None:
+        if self._watchdog_task:
+            self._watchdog_task.cancel()
+            try:
+                await self._watchdog_task
+            except asyncio.CancelledError:
+                pass
+            self._watchdog_task = None
+
+    async def _watchdog(self) -> None:
+        interval = min(1.0, self.liveness_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            websocket_client = shared_context.websocket_client
+            if self.reconnecting or not websocket_client.is_connected:
+                continue
+            silence = time.monotonic() - websocket_client.last_received
+            if silence > self.liveness_timeout:
+                self.stats.missed_heartbeats += 1
+                self.logger.warning(f"💔 Nothing received for {silence:.1f}s, dropping the connection")
+                websocket_client.abort()
+
+    def queue_answer(self, block_index: int, answer_type: str, value) -> bool:
+        """Keep an answer for replay after the reconnect, returns False when reconnecting is disabled"""
+        if not self.enabled:
+            return False
+        self.pending_answers[block_index] = (answer_type, value)
+        return True
+
+    async def reconnect(self) -> bool:
+        """Recover the connection, returns whether it is up again"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have recovered it while we waited
+            if shared_context.websocket_client.is_connected:
+                return True
+            return await self._recover()
+
+    async def _recover(self) -> bool:
+        websocket_client = shared_context.websocket_client
+        started = websocket_client.closed_at or time.perf_counter()
+        self.reconnecting = True
+        self.stats.disconnects += 1
+        self.logger.warning("🔌 Connection lost, reconnecting...")
+
+        resumable = bool(shared_context.client_id and websocket_client.url)
+        try:
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    # Full jitter, so many clients dropped together do not retry in step
+                    await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+                self.stats.attempts += 1
+
+                try:
+                    if resumable and await self._resume():
+                        self.stats.resumes += 1
+                        how = "resumed"
+                    else:
+                        resumable = False
+                        await self._relogin()
+                        self.stats.relogins += 1
+                        how = "relogin"
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"Reconnect attempt {attempt + 1}/{self.max_attempts} failed: {e}")
+                    continue
+
+                elapsed = time.perf_counter() - started
+                self.stats.last_recovery_time = elapsed
+                self.stats.total_recovery_time += elapsed
+                self.stats.max_recovery_time = max(self.stats.max_recovery_time, elapsed)
+                shared_context.metrics.reconnects.inc(1, how)
+                self.logger.info(f"🔁 Reconnected ({how}) in {elapsed * 1000:.1f} ms")
+                return True
+
+            self.stats.failures += 1
+            shared_context.metrics.reconnects.inc(1, "failed")
+            self.logger.error(f"❌ Could not reconnect after {self.max_attempts} attempts")
+            return False
+        finally:
+            self.reconnecting = False
+
+    async def _resume(self) -> bool:
+        websocket_client = shared_context.websocket_client
+        await websocket_client.close()
+        if not await websocket_client.connect(websocket_client.url):
+            return False
+        return await self.handshake_handler.perform_resume()
+
+    async def _relogin(self) -> None:
+        await shared_context.websocket_client.close()
+        if not await self.open_connection():
+            raise ConnectionError("Could not open a new connection")
+        await self.handshake_handler.perform_handshake(relogin_cid=shared_context.cid)
+
+    async def replay_answers(self) -> None:
+        """Send the answers queued during the outage to questions that are still running.
+
+        Called by the listen loop after the redelivered messages, so a question whose end
+        event was among them is no longer "started"; one past its deadline is dropped too.
+        """
+        websocket_client = shared_context.websocket_client
+        game_blocks = shared_context.game_event_handler.gameBlocks
+        while self.pending_answers:
+            block_index, (answer_type, value) = self.pending_answers.popitem(last=False)
+            block = game_blocks.get(block_index)
+            time_left = None if block is None else BlockContext(block_index, block).time_left()
+            if block is None or block.status != "started" or time_left == 0.0:
+                self.stats.answers_dropped += 1
+                self.logger.info(f"Dropped queued answer for question {block_index}, it is no longer running")
+                continue
+
+            try:
+                # Encoded now, for the client ID and message counter of the new connection
+                await websocket_client.send_answer(PacketFactory.encode_answer(answer_type, block_index, value))
+            except ConnectionError:
+                self.pending_answers[block_index] = (answer_type, value)
+                self.pending_answers.move_to_end(block_index, last=False)
+                return
+            block.answer_sent_at = time.perf_counter()
+            self.stats.answers_replayed += 1
+            self.logger.info(f"✅ Replayed queued answer for question {block_index}")
+
+    def report(self) -> Dict[str, Any]:
+        report = self.stats.as_dict()
+        report["pending_answers"] = len(self.pending_answers)
+        return report
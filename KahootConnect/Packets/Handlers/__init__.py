@@ -1,5 +1,10 @@
 from .HandshakeHandler import HandshakeHandler
 from .GameEventHandler import GameEventHandler
 from .BlockContext import BlockContext
+from .GameBlock import GameBlock
+from .GameBlockStore import GameBlockStore, BlockSummary
+from .EventBus import EventBus, Subscription
+from .HandlerExecutor import HandlerExecutor
+from .ReconnectHandler import ReconnectHandler, ReconnectStats
 
-__all__ = ['HandshakeHandler', 'GameEventHandler', 'BlockContext']
\ No newline at end of file
+__all__ = ['HandshakeHandler', 'GameEventHandler', 'BlockContext', 'GameBlock', 'GameBlockStore', 'BlockSummary', 'EventBus', 'Subscription', 'HandlerExecutor', 'ReconnectHandler', 'ReconnectStats']
\ No newline at end of file
@@ -1,4 +1,3 @@
-import json
 from typing import Dict, Any
 from ...Context import shared_context
 
@@ -19,14 +18,5 @@ class BaseMessage:
     def _get_extensions(self) -> Dict[str, Any]:
         """Get message extensions (timesync)"""
         return {
-            "timesync": {
-                "tc": self._get_timestamp(),
-                "l": 0,
-                "o": 0
-            }
-        }
-
-    def _get_timestamp(self) -> int:
-        """Get current timestamp in milliseconds"""
-        import asyncio
-        return int(asyncio.get_event_loop().time() * 1000)
\ No newline at end of file
+            "timesync": shared_context.clock.timesync()
+        }
\ No newline at end of file
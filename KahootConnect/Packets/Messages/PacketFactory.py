@@ -1,112 +1,48 @@
-import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from ...Context import shared_context
+from ...Protocol.KahootProtocol import ANSWER_TYPES, ANSWER_ID
 
 class PacketFactory:
-    @staticmethod
-    def _get_timestamp() -> int:
-        """Get current timestamp in milliseconds"""
-        import time
-        return int(time.time() * 1000)
+    """Messages of the current player, built by the protocol in shared_context.protocol.
+
+    Built packets carry the current message id, replaced by the next one when they are
+    sent. The encode_* methods return finished messages and take their id right away.
+    """
 
     @staticmethod
     def create_handshake_request() -> Dict[str, Any]:
         """Create handshake packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "version": "1.0", 
-            "minimumVersion": "1.0",
-            "channel": "/meta/handshake",
-            "supportedConnectionTypes": ["websocket", "long-polling", "callback-polling"],
-            "advice": {"timeout": 60000, "interval": 0},
-            "ext": {
-                "ack": True,
-                "timesync": {"tc": PacketFactory._get_timestamp(), "l": 0, "o": 0}
-            }
-        }
-        return packet
+        return shared_context.protocol.handshake()
 
     @staticmethod
-    def create_initial_connect() -> Dict[str, Any]:
-        """Create initial connect packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/meta/connect",
-            "connectionType": "websocket", 
-            "advice": {"timeout": 0},
-            "clientId": shared_context.client_id,
-            "ext": {
-                "ack": 0,
-                "timesync": {"tc": PacketFactory._get_timestamp(), "l": 0, "o": 0}
-            }
-        }
-        return packet
+    def create_initial_connect(ack_value: int = 0) -> Dict[str, Any]:
+        """Create initial connect packet, answered at once; also used to resume a session"""
+        return shared_context.protocol.connect(ack_value, immediate=True)
 
     @staticmethod
     def create_connect(ack_value: int) -> Dict[str, Any]:
         """Create connect packet with specific ack value"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/meta/connect",
-            "connectionType": "websocket",
-            "clientId": shared_context.client_id,
-            "ext": {
-                "ack": ack_value,
-                "timesync": {"tc": PacketFactory._get_timestamp(), "l": 0, "o": 0}
-            }
-        }
-        return packet
+        return shared_context.protocol.connect(ack_value)
 
     @staticmethod
     def create_acknowledgement() -> Dict[str, Any]:
         """Create acknowledgement packet - uses current ack counter value"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/meta/connect",
-            "connectionType": "websocket",
-            "clientId": shared_context.client_id,
-            "ext": {
-                "ack": shared_context.ack_counter,  # Use current value, don't increment
-                "timesync": {"tc": PacketFactory._get_timestamp(), "l": 0, "o": 0}
-            }
-        }
-        return packet
+        return shared_context.protocol.connect()
 
     @staticmethod
     def create_login_request() -> Dict[str, Any]:
         """Create login request packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/service/controller",
-            "data": {
-                "type": "login",
-                "gameid": shared_context.game_pin,
-                "host": "kahoot.it",
-                "name": shared_context.player_name,
-                "content": "{}"
-            },
-            "clientId": shared_context.client_id,
-            "ext": {}
-        }
-        return packet
+        return shared_context.protocol.login()
+
+    @staticmethod
+    def create_relogin_request(cid) -> Dict[str, Any]:
+        """Create relogin packet, rejoining as the player identified by cid"""
+        return shared_context.protocol.relogin(cid)
 
     @staticmethod
     def create_client_ready() -> Dict[str, Any]:
         """Create client ready packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/service/controller", 
-            "data": {
-                "gameid": shared_context.game_pin,
-                "type": "message",
-                "host": "kahoot.it",
-                "id": 16,
-                "content": json.dumps({"usingNamerator": False})
-            },
-            "clientId": shared_context.client_id,
-            "ext": {}
-        }
-        return packet
+        return shared_context.protocol.client_ready()
 
     # =============================
     #  ANSWER PACKETS
@@ -125,7 +61,7 @@ class PacketFactory:
     def create_multiple_select_answer(question_index: int, choices: List[int]) -> Dict[str, Any]:
         """Create multiple select quiz answer packet"""
         return PacketFactory._create_answer_base({
-            "type": "multiple_select_quiz", 
+            "type": "multiple_select_quiz",
             "choice": choices,
             "questionIndex": question_index
         })
@@ -158,26 +94,47 @@ class PacketFactory:
         })
 
     # =============================
-    #  INTERNAL HELPERS  
+    #  INTERNAL HELPERS
     # =============================
 
     @staticmethod
     def _create_answer_base(content: Dict[str, Any]) -> Dict[str, Any]:
         """Base packet structure for all answers"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/service/controller",
-            "data": {
-                "gameid": shared_context.game_pin,
-                "type": "message",
-                "host": "kahoot.it",
-                "id": 45,
-                "content": json.dumps(content)
-            },
-            "clientId": shared_context.client_id,
-            "ext": {}
-        }
-        return packet
+        return shared_context.protocol.controller_message(ANSWER_ID, content)
+
+    # =============================
+    #  PRE-SERIALIZED ANSWERS
+    # =============================
+
+    @staticmethod
+    def encode_answer(answer_type: str, question_index: int, value: Any) -> str:
+        """Encode an answer message (quiz, multiple_select_quiz, slider, open_ended or jumble)"""
+        return shared_context.protocol.encode_answer(answer_type, question_index, value)
+
+    @staticmethod
+    def stage_answer(answer_type: str, question_index: int, value: Any) -> Tuple[str, str]:
+        """Encode an answer ahead of time, split around the message id assigned when it is sent"""
+        return shared_context.protocol.stage_answer(answer_type, question_index, value)
+
+    @staticmethod
+    def encode_staged(staged: Tuple[str, str]) -> str:
+        """Complete a staged answer with the next message id"""
+        return shared_context.protocol.encode_staged(staged)
+
+    @staticmethod
+    def encode_join_team(team_name: str) -> str:
+        """Encode join team message"""
+        return shared_context.protocol.encode_join_team(team_name)
+
+    @staticmethod
+    def encode_leave_team() -> str:
+        """Encode leave team message"""
+        return shared_context.protocol.encode_leave_team()
+
+    @staticmethod
+    def encode_reaction(reaction_type: str) -> str:
+        """Encode reaction message"""
+        return shared_context.protocol.encode_reaction(reaction_type)
 
     # =============================
     #  GAME INTERACTION PACKETS
@@ -209,23 +166,7 @@ class PacketFactory:
     @staticmethod
     def create_nickname_change(new_name: str) -> Dict[str, Any]:
         """Create nickname change request packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/service/controller",
-            "data": {
-                "gameid": shared_context.game_pin,
-                "type": "message",
-                "host": "kahoot.it",
-                "id": 16,
-                "content": json.dumps({
-                    "usingNamerator": True,
-                    "newName": new_name
-                })
-            },
-            "clientId": shared_context.client_id,
-            "ext": {}
-        }
-        return packet
+        return shared_context.protocol.client_ready(new_name)
 
     # =============================
     #  HEARTBEAT/MAINTENANCE PACKETS
@@ -239,12 +180,7 @@ class PacketFactory:
     @staticmethod
     def create_disconnect() -> Dict[str, Any]:
         """Create disconnect packet"""
-        packet = {
-            "id": PacketFactory.get_message_id(),
-            "channel": "/meta/disconnect",
-            "clientId": shared_context.client_id
-        }
-        return packet
+        return shared_context.protocol.disconnect()
 
     # =============================
     #  UTILITY METHODS
@@ -253,4 +189,4 @@ class PacketFactory:
     @staticmethod
     def get_message_id() -> str:
         """Get current message ID"""
-        return str(shared_context.message_counter)
\ No newline at end of file
+        return shared_context.protocol.message_id()
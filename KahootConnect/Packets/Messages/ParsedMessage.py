@@ -0,0 +1,4 @@
+# Moved to the protocol core; kept importable from here
+from ...Protocol.ParsedMessage import ParsedMessage
+
+__all__ = ['ParsedMessage']
@@ -1,4 +1,5 @@
 from .BaseMessage import BaseMessage
 from .PacketFactory import PacketFactory
+from .ParsedMessage import ParsedMessage
 
-__all__ = ['BaseMessage', 'PacketFactory']
\ No newline at end of file
+__all__ = ['BaseMessage', 'PacketFactory', 'ParsedMessage']
\ No newline at end of file
@@ -1,6 +1,7 @@
 from .Messages.PacketFactory import PacketFactory
+from .Messages.ParsedMessage import ParsedMessage
 from .Handlers.HandshakeHandler import HandshakeHandler
 from .Handlers.GameEventHandler import GameEventHandler
 from .Handlers.BlockContext import BlockContext
 
-__all__ = ['PacketFactory', 'HandshakeHandler', 'GameEventHandler', 'BlockContext']
\ No newline at end of file
+__all__ = ['PacketFactory', 'ParsedMessage', 'HandshakeHandler', 'GameEventHandler', 'BlockContext']
\ No newline at end of file
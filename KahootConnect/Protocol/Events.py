@@ -0,0 +1,104 @@
+# KahootConnect/Protocol/Events.py
+from typing import Any, Dict, Optional
+from .ParsedMessage import ParsedMessage
+
+# /service/player data.id of the Kahoot game messages
+GAME_BLOCK_PREFETCH_ID = 1
+GAME_BLOCK_START_ID = 2
+GAME_BLOCK_END_ID = 8
+GAME_DATA_ID = 9
+PLAYER_DATA_ID = 14
+
+class ProtocolEvent:
+    """What one received message means, returned by KahootProtocol.receive_frame.
+
+    Every event keeps the message it was read from in `message`, so a driver can pass
+    the message on unchanged (the listen loop and the handlers work on ParsedMessage).
+    """
+
+    __slots__ = ('message',)
+
+    def __init__(self, message: ParsedMessage):
+        self.message = message
+
+    @property
+    def channel(self) -> str:
+        return self.message.channel
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields or self.message.channel})"
+
+class HandshakeReply(ProtocolEvent):
+    """/meta/handshake reply; a successful one assigned the protocol its client ID"""
+
+    __slots__ = ('successful', 'client_id', 'advice', 'error')
+
+    def __init__(self, message: ParsedMessage, successful: bool, client_id: str,
+                 advice: Optional[Dict[str, Any]], error: Optional[str]):
+        super().__init__(message)
+        self.successful = successful
+        self.client_id = client_id
+        self.advice = advice
+        self.error = error
+
+class ConnectReply(ProtocolEvent):
+    """/meta/connect reply; `round_trip` is its timesync round trip in ms, if it had one"""
+
+    __slots__ = ('successful', 'ack', 'advice', 'error', 'round_trip')
+
+    def __init__(self, message: ParsedMessage, successful: bool, ack: Optional[int],
+                 advice: Optional[Dict[str, Any]], error: Optional[str], round_trip: Optional[float]):
+        super().__init__(message)
+        self.successful = successful
+        self.ack = ack
+        self.advice = advice
+        self.error = error
+        self.round_trip = round_trip
+
+class ControllerReply(ProtocolEvent):
+    """Reply to a /service/controller message we sent, matched by its message id"""
+
+    __slots__ = ('message_id', 'successful', 'error')
+
+    def __init__(self, message: ParsedMessage, message_id: Optional[str], successful: bool, error: Optional[str]):
+        super().__init__(message)
+        self.message_id = message_id
+        self.successful = successful
+        self.error = error
+
+class LoginAccepted(ProtocolEvent):
+    """Login or relogin response carrying the player's cid"""
+
+    __slots__ = ('cid',)
+
+    def __init__(self, message: ParsedMessage, cid: Any):
+        super().__init__(message)
+        self.cid = cid
+
+class StatusChanged(ProtocolEvent):
+    """/service/status message, e.g. ACTIVE once the game accepts players"""
+
+    __slots__ = ('status',)
+
+    def __init__(self, message: ParsedMessage, status: Optional[str]):
+        super().__init__(message)
+        self.status = status
+
+class PlayerMessage(ProtocolEvent):
+    """/service/player message; `data_id` says what it is (see the *_ID constants)"""
+
+    __slots__ = ('data_id',)
+
+    def __init__(self, message: ParsedMessage, data_id: Optional[int]):
+        super().__init__(message)
+        self.data_id = data_id
+
+    @property
+    def content(self) -> Optional[Any]:
+        return self.message.content
+
+class OtherMessage(ProtocolEvent):
+    """Any message the protocol has no meaning for"""
+
+    __slots__ = ()
@@ -0,0 +1,309 @@
+# KahootConnect/Protocol/KahootProtocol.py
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from ..ClockSync import ClockSync
+from ..Codec.JsonCodec import get_codec
+from .ParsedMessage import ParsedMessage
+from .Events import (ProtocolEvent, HandshakeReply, ConnectReply, ControllerReply, LoginAccepted,
+                     StatusChanged, PlayerMessage, OtherMessage)
+
+# Placeholder values used while pre-serializing answer templates
+_ID_SLOT = "@@ID@@"
+_VALUE_SLOT = "@@SLOT@@"
+
+# Question types answered through encode_answer
+ANSWER_TYPES = ("quiz", "multiple_select_quiz", "slider", "open_ended", "jumble")
+
+# Content of every templated controller message, slots in substitution order
+_TEMPLATE_CONTENT = {
+    "quiz": {"type": "quiz", "choice": _VALUE_SLOT, "questionIndex": _VALUE_SLOT},
+    "multiple_select_quiz": {"type": "multiple_select_quiz", "choice": _VALUE_SLOT, "questionIndex": _VALUE_SLOT},
+    "slider": {"type": "slider", "choice": _VALUE_SLOT, "questionIndex": _VALUE_SLOT},
+    "open_ended": {"type": "open_ended", "text": _VALUE_SLOT, "questionIndex": _VALUE_SLOT},
+    "jumble": {"type": "jumble", "choice": _VALUE_SLOT, "questionIndex": _VALUE_SLOT},
+    "team_accept": {"type": "team_accept", "teamName": _VALUE_SLOT},
+    "team_leave": {"type": "team_leave"},
+    "reaction": {"type": "reaction", "reaction": _VALUE_SLOT},
+}
+
+# data.id of the controller messages we send
+CLIENT_READY_ID = 16
+ANSWER_ID = 45
+
+class KahootProtocol:
+    """The Bayeux and Kahoot protocol of one player, without any I/O.
+
+    Received frames go in through receive_frame(), which returns a typed event per
+    message (see Events) after updating the protocol state: the client ID, the ack of
+    the next /meta/connect, the cid, the server advice and the clock estimates from
+    timesync. Outbound messages come out of the builders (handshake(), connect(),
+    login(), ...) as dicts, encoded with prepare(), or ready-encoded from the
+    encode_* methods; those take the message id, so what they return is what goes on
+    the wire. Sending, receiving and timing are left to the driver - WebSocketClient
+    for the asyncio client - so the same object runs under a replay, a benchmark or
+    another transport.
+    """
+
+    def __init__(self, game_pin: str = "", player_name: str = "", codec=None, clock: Optional[ClockSync] = None):
+        self.logger = logging.getLogger(__name__)
+        self.game_pin = game_pin
+        self.player_name = player_name
+        self.codec = codec or get_codec()
+        self.clock = clock or ClockSync()
+        self.client_id = ""
+        self.cid = 0
+        self.message_counter = 1
+        # ack carried by the next /meta/connect: the last one received plus one
+        self.ack_counter = 2
+        # Last advice of the server, in milliseconds as sent
+        self.advice: Dict[str, Any] = {}
+        # Pre-serialized controller messages, rebuilt when the game pin, client ID or codec changes
+        self._templates: Dict[str, str] = {}
+        self._templates_key = None
+
+    def reset(self) -> None:
+        """Start the counters over for a new handshake"""
+        self.message_counter = 1
+        self.ack_counter = 0
+
+    # =============================
+    #  INBOUND
+    # =============================
+
+    def receive_frame(self, frame, received_at: float = 0.0, received_ms: Optional[float] = None) -> List[ProtocolEvent]:
+        """Decode a Bayeux frame and return an event for every message it carries, in order.
+
+        received_at is stored on the messages (the client uses time.perf_counter());
+        received_ms is the wall clock the timesync round trips are measured against,
+        now when omitted. Raises ValueError for a frame that is not JSON.
+        """
+        decoded = self.codec.loads(frame)
+        if isinstance(decoded, dict):
+            decoded = [decoded]
+        elif not isinstance(decoded, list):
+            self.logger.warning(f"Ignoring non-Bayeux frame: {type(decoded)}")
+            return []
+        if received_ms is None:
+            received_ms = time.time() * 1000
+
+        events = []
+        for packet in decoded:
+            if not isinstance(packet, dict):
+                self.logger.warning(f"Ignoring non-dict message in frame: {packet}")
+                continue
+            events.append(self.receive_message(ParsedMessage(packet, received_at, self.codec), received_ms))
+        return events
+
+    def receive_message(self, message: ParsedMessage, received_ms: Optional[float] = None) -> ProtocolEvent:
+        """Update the protocol state from one received message and return what it means"""
+        packet = message.packet
+        channel = message.channel
+
+        # Server timesync replies keep the clock offset and lag estimates fresh
+        round_trip = None
+        ext = packet.get('ext')
+        if ext and 'timesync' in ext:
+            round_trip = self.clock.handle_reply(ext['timesync'], received_ms)
+
+        if channel == '/service/player':
+            return PlayerMessage(message, message.data.get('id'))
+
+        if channel == '/meta/connect':
+            ack = ext.get('ack') if ext else None
+            if ack is not None:
+                # The next ack we send is the one received plus one
+                self.ack_counter = ack + 1
+            advice = packet.get('advice')
+            self._apply_advice(advice)
+            return ConnectReply(message, bool(packet.get('successful')), ack, advice, packet.get('error'), round_trip)
+
+        if channel == '/service/controller':
+            cid = message.data.get('cid')
+            if cid:
+                self.cid = cid
+                return LoginAccepted(message, cid)
+            if 'successful' in packet:
+                return ControllerReply(message, packet.get('id'), bool(packet['successful']), packet.get('error'))
+            return OtherMessage(message)
+
+        if channel == '/service/status':
+            return StatusChanged(message, message.data.get('status'))
+
+        if channel == '/meta/handshake':
+            successful = bool(packet.get('successful'))
+            client_id = packet.get('clientId') or ''
+            if successful and client_id:
+                self.client_id = client_id
+            advice = packet.get('advice')
+            self._apply_advice(advice)
+            return HandshakeReply(message, successful, client_id, advice, packet.get('error'))
+
+        return OtherMessage(message)
+
+    def _apply_advice(self, advice: Optional[Dict[str, Any]]) -> None:
+        if advice:
+            self.advice.update(advice)
+
+    # =============================
+    #  OUTBOUND
+    # =============================
+
+    def message_id(self) -> str:
+        """The id the next outbound message will take"""
+        return str(self.message_counter)
+
+    def next_message_id(self) -> str:
+        """Take the id of an outbound message"""
+        message_id = str(self.message_counter)
+        self.message_counter += 1
+        return message_id
+
+    def prepare(self, message: Dict[str, Any]) -> str:
+        """Give a built message the next id and encode it for sending"""
+        message["id"] = self.next_message_id()
+        return self.codec.dumps(message)
+
+    def handshake(self) -> Dict[str, Any]:
+        return {
+            "id": self.message_id(),
+            "version": "1.0",
+            "minimumVersion": "1.0",
+            "channel": "/meta/handshake",
+            "supportedConnectionTypes": ["websocket", "long-polling", "callback-polling"],
+            "advice": {"timeout": 60000, "interval": 0},
+            "ext": {"ack": True, "timesync": self.clock.timesync()},
+        }
+
+    def connect(self, ack: Optional[int] = None, immediate: bool = False) -> Dict[str, Any]:
+        """/meta/connect carrying `ack` (the current ack counter by default).
+
+        An immediate connect (advice timeout 0) is answered at once instead of held by
+        the server; it opens the session and resumes one on a new connection.
+        """
+        message = {
+            "id": self.message_id(),
+            "channel": "/meta/connect",
+            "connectionType": "websocket",
+        }
+        if immediate:
+            message["advice"] = {"timeout": 0}
+        message["clientId"] = self.client_id
+        message["ext"] = {
+            "ack": self.ack_counter if ack is None else ack,
+            "timesync": self.clock.timesync(),
+        }
+        return message
+
+    def disconnect(self) -> Dict[str, Any]:
+        return {"id": self.message_id(), "channel": "/meta/disconnect", "clientId": self.client_id}
+
+    def login(self) -> Dict[str, Any]:
+        return self._controller({
+            "type": "login",
+            "gameid": self.game_pin,
+            "host": "kahoot.it",
+            "name": self.player_name,
+            "content": "{}",
+        })
+
+    def relogin(self, cid: Any = None) -> Dict[str, Any]:
+        """Rejoin as the player identified by cid (the current one by default)"""
+        return self._controller({
+            "type": "relogin",
+            "cid": self.cid if cid is None else cid,
+            "gameid": self.game_pin,
+            "host": "kahoot.it",
+            "content": "{}",
+        })
+
+    def client_ready(self, new_name: Optional[str] = None) -> Dict[str, Any]:
+        """The ready message ending the login; with new_name it changes the nickname instead"""
+        content = {"usingNamerator": False} if new_name is None else {"usingNamerator": True, "newName": new_name}
+        return self.controller_message(CLIENT_READY_ID, content)
+
+    def controller_message(self, data_id: int, content: Any, message_id: Optional[str] = None) -> Dict[str, Any]:
+        """A Kahoot /service/controller message of type "message" with the given data.id"""
+        return self._controller({
+            "gameid": self.game_pin,
+            "type": "message",
+            "host": "kahoot.it",
+            "id": data_id,
+            "content": self.codec.dumps(content),
+        }, message_id)
+
+    def _controller(self, data: Dict[str, Any], message_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": message_id if message_id is not None else self.message_id(),
+            "channel": "/service/controller",
+            "data": data,
+            "clientId": self.client_id,
+            "ext": {},
+        }
+
+    # =============================
+    #  PRE-SERIALIZED MESSAGES
+    # =============================
+
+    def _get_template(self, name: str) -> str:
+        """Return the %-format template of an encoded controller message"""
+        key = (self.game_pin, self.client_id, self.codec)
+        if self._templates_key != key:
+            self._templates = {}
+            self._templates_key = key
+
+        template = self._templates.get(name)
+        if template is None:
+            encoded = self.codec.dumps(self.controller_message(ANSWER_ID, _TEMPLATE_CONTENT[name], _ID_SLOT))
+            # Value slots sit inside the content string, so their quotes arrive escaped
+            template = (encoded.replace('%', '%%')
+                               .replace(_ID_SLOT, '%s')
+                               .replace(f'\\"{_VALUE_SLOT}\\"', '%s'))
+            self._templates[name] = template
+        return template
+
+    def _encode_slot(self, value: Any) -> str:
+        """Encode a value for substitution into the nested content string"""
+        if type(value) is int:
+            return str(value)
+        if type(value) is list and all(type(item) is int for item in value):
+            return '[' + ','.join(map(str, value)) + ']'
+        # Encode the value as JSON, then escape that text as a JSON string body
+        codec = self.codec
+        return codec.dumps(codec.dumps(value))[1:-1]
+
+    def encode_answer(self, answer_type: str, question_index: int, value: Any) -> str:
+        """Encode an answer message (quiz, multiple_select_quiz, slider, open_ended or jumble)"""
+        if answer_type not in ANSWER_TYPES:
+            raise ValueError(f"Unsupported question type: {answer_type}")
+        return self._get_template(answer_type) % (
+            self.next_message_id(),
+            self._encode_slot(value),
+            self._encode_slot(question_index)
+        )
+
+    def stage_answer(self, answer_type: str, question_index: int, value: Any) -> Tuple[str, str]:
+        """Encode an answer ahead of time, split around the message id assigned when it is sent"""
+        if answer_type not in ANSWER_TYPES:
+            raise ValueError(f"Unsupported question type: {answer_type}")
+        encoded = self._get_template(answer_type) % (
+            _ID_SLOT,
+            self._encode_slot(value),
+            self._encode_slot(question_index)
+        )
+        # The id is the first field, so the first occurrence is the slot
+        prefix, suffix = encoded.split(_ID_SLOT, 1)
+        return prefix, suffix
+
+    def encode_staged(self, staged: Tuple[str, str]) -> str:
+        """Complete a staged answer with the next message id"""
+        return staged[0] + self.next_message_id() + staged[1]
+
+    def encode_join_team(self, team_name: str) -> str:
+        return self._get_template("team_accept") % (self.next_message_id(), self._encode_slot(team_name))
+
+    def encode_leave_team(self) -> str:
+        return self._get_template("team_leave") % (self.next_message_id(),)
+
+    def encode_reaction(self, reaction_type: str) -> str:
+        return self._get_template("reaction") % (self.next_message_id(), self._encode_slot(reaction_type))
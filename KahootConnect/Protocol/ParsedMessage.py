@@ -0,0 +1,52 @@
+# KahootConnect/Protocol/ParsedMessage.py
+from typing import Any, Dict, Optional
+from ..Codec.JsonCodec import get_codec
+
+_UNPARSED = object()
+
+# Decodes data.content of messages built without a codec; every codec reads the same JSON
+_default_codec = get_codec()
+
+class ParsedMessage:
+    """A received Bayeux message carrying both the raw and the decoded data.content"""
+
+    __slots__ = ('packet', 'channel', 'data', 'raw_content', 'received_at', 'codec', '_content', 'content_error')
+
+    def __init__(self, packet: Dict[str, Any], received_at: float = 0.0, codec=None):
+        self.packet = packet
+        self.channel = packet.get('channel', '')
+        data = packet.get('data')
+        self.data = data if isinstance(data, dict) else {}
+        self.raw_content = self.data.get('content')
+        self.received_at = received_at
+        self.codec = codec
+        self._content = _UNPARSED
+        self.content_error = None
+
+    @property
+    def content(self) -> Optional[Any]:
+        """data.content decoded on first access and cached for every later reader"""
+        if self._content is _UNPARSED:
+            raw = self.raw_content
+            if isinstance(raw, (str, bytes)):
+                try:
+                    self._content = (self.codec or _default_codec).loads(raw)
+                except ValueError as e:
+                    self.content_error = e
+                    self._content = None
+            else:
+                self._content = raw
+        return self._content
+
+    # Dict-style access to the raw packet
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.packet.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.packet[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.packet
+
+    def __repr__(self) -> str:
+        return f"ParsedMessage({self.packet!r})"
@@ -0,0 +1,9 @@
+from .ParsedMessage import ParsedMessage
+from .Events import (ProtocolEvent, HandshakeReply, ConnectReply, ControllerReply, LoginAccepted, StatusChanged,
+                     PlayerMessage, OtherMessage, GAME_BLOCK_PREFETCH_ID, GAME_BLOCK_START_ID, GAME_BLOCK_END_ID,
+                     GAME_DATA_ID, PLAYER_DATA_ID)
+from .KahootProtocol import KahootProtocol, ANSWER_TYPES
+
+__all__ = ['KahootProtocol', 'ANSWER_TYPES', 'ParsedMessage', 'ProtocolEvent', 'HandshakeReply', 'ConnectReply',
+           'ControllerReply', 'LoginAccepted', 'StatusChanged', 'PlayerMessage', 'OtherMessage',
+           'GAME_BLOCK_PREFETCH_ID', 'GAME_BLOCK_START_ID', 'GAME_BLOCK_END_ID', 'GAME_DATA_ID', 'PLAYER_DATA_ID']
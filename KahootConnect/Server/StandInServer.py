@@ -0,0 +1,500 @@
+# KahootConnect/Server/StandInServer.py
+import time
+import base64
+import random
+import secrets
+import asyncio
+import logging
+import urllib.parse
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional
+
+import websockets
+from websockets.asyncio.server import serve
+
+from ..Codec.JsonCodec import get_codec
+from ..Crypto.TokenDecryptor import TokenDecryptor
+
+def encode_session_token(token: str, message: str, offset: int) -> str:
+    """Encrypt a session token the way the reserve endpoint does"""
+    key = TokenDecryptor().generate_key(message, offset)
+    encrypted = ''.join(chr(ord(char) ^ ord(key[i % len(key)])) for i, char in enumerate(token))
+    return base64.b64encode(encrypted.encode('utf-8')).decode('ascii')
+
+def build_challenge(message: str, terms: List[int]) -> str:
+    """Build a reserve challenge script using the ((a+b)*(c+d)) offset form"""
+    a, b, c, d = terms
+    return (f"decode.call(this, '{message}'); "
+            f"function decode(message) {{ var offset = (({a} + {b}) * ({c} + {d})); "
+            f"if (this.angular.isString(message)) {{ return message; }} }}")
+
+class ScriptedQuestion:
+    """One question of the stand-in game, answered by the client between start and end"""
+
+    def __init__(self,
+                 type: str = "quiz",
+                 correct: Any = 0,
+                 number_of_choices: int = 4,
+                 time_available: int = 20000,
+                 get_ready: float = 0.05,
+                 prefetch_lead: float = 0.05,
+                 content: Optional[Dict[str, Any]] = None):
+        self.type = type
+        self.correct = correct
+        self.number_of_choices = number_of_choices
+        self.time_available = time_available
+        self.get_ready = get_ready  # seconds before the prefetch (data.id 1)
+        self.prefetch_lead = prefetch_lead  # seconds between prefetch and start (data.id 2)
+        self.content = content or {}
+
+    def question_content(self, index: int, total: int) -> Dict[str, Any]:
+        content = {
+            "gameBlockIndex": index,
+            "totalGameBlockCount": total,
+            "layout": "CLASSIC",
+            "type": self.type,
+            "timeRemaining": self.time_available,
+            "timeAvailable": self.time_available,
+            "numberOfAnswersAllowed": 1,
+            "numberOfChoices": self.number_of_choices,
+            "questionIndex": index,
+            "gameBlockType": self.type,
+        }
+        if self.type == "slider":
+            content.update({"minRange": 0, "maxRange": 100, "step": 1})
+        content.update(self.content)
+        return content
+
+    def result_content(self, index: int, answer: Optional[Dict[str, Any]], total_score: int) -> Dict[str, Any]:
+        answered = answer is not None
+        if self.type == "open_ended":
+            given = answer.get("text") if answered else None
+            is_correct = answered and str(given).strip().lower() == str(self.correct).strip().lower()
+            result = {"text": given, "correctTexts": [self.correct]}
+        else:
+            given = answer.get("choice") if answered else None
+            is_correct = answered and given == self.correct
+            result = {"choice": given, "correctChoices": self.correct if isinstance(self.correct, list) else [self.correct]}
+
+        points = 1000 if is_correct else 0
+        result.update({
+            "type": self.type,
+            "rank": 1,
+            "totalScore": total_score + points,
+            "pointsData": {
+                "totalPointsWithBonuses": total_score + points,
+                "questionPoints": points,
+                "answerStreakPoints": {"streakLevel": 0, "previousStreakLevel": 0},
+                "lastGameBlockIndex": index
+            },
+            "hasAnswer": answered,
+            "skip": False,
+            "points": points,
+            "isCorrect": bool(is_correct),
+        })
+        return result
+
+class _Session:
+    """State of one Bayeux client, which outlives the WebSocket it is attached to"""
+
+    def __init__(self, websocket):
+        # None while detached; messages meanwhile wait in the outbox
+        self.websocket = websocket
+        self.client_id = ""
+        self.cid = ""
+        self.player_name = ""
+        self.ack = 0
+        self.pending_connect = None
+        self.connect_held = asyncio.Event()
+        self.connect_timer = None
+        self.game_task = None
+        self.total_score = 0
+        self.answer = None
+        self.answered = asyncio.Event()
+        self.outbox: List[Dict[str, Any]] = []
+        self.expire_timer = None
+
+class StandInServer:
+    """Local Bayeux/CometD stand-in for kahoot.it serving the whole join and question flow.
+
+    Serves GET /reserve/session/{pin}/ with an encrypted token and challenge, and the
+    /cometd/{pin}/{token} WebSocket: handshake, held /meta/connect polls with acks, login
+    with a cid, status ACTIVE and the scripted prefetch/start/end (data.id 1/2/8) events.
+
+    A client whose WebSocket drops is kept for `session_timeout` seconds: a connect with
+    its client ID on a new WebSocket resumes it, and a relogin with its cid moves the
+    game to a new client ID. Events pushed meanwhile are delivered once it is back.
+    """
+
+    def __init__(self,
+                 game_pin: str = "1234567",
+                 questions: Optional[List[ScriptedQuestion]] = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 connect_timeout: float = 30.0,
+                 start_delay: float = 0.05,
+                 session_timeout: float = 10.0):
+        self.game_pin = game_pin
+        self.questions = questions if questions is not None else [ScriptedQuestion() for _ in range(3)]
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.start_delay = start_delay
+        self.session_timeout = session_timeout
+        self.codec = get_codec()
+        self.logger = logging.getLogger(__name__)
+
+        self.session_token = secrets.token_hex(32)
+        self._challenge_message = ''.join(random.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(100))
+        self._challenge_terms = [random.randint(1, 99) for _ in range(4)]
+
+        # Per question timings, appended as the scripted game runs
+        self.question_log: List[Dict[str, Any]] = []
+        self.received: List[Dict[str, Any]] = []
+        self._server = None
+        self._clients: Dict[str, _Session] = {}
+        self._players: Dict[str, _Session] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def websocket_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await serve(self._handle_connection, self.host, self.port,
+                                   process_request=self._process_request)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Stand-in server listening on {self.base_url}")
+
+    async def stop(self) -> None:
+        for session in set(self._clients.values()) | set(self._players.values()):
+            self._cancel_session(session)
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def drop_connections(self, forget_clients: bool = False) -> int:
+        """Cut every client WebSocket without a close handshake, like a network failure.
+
+        With forget_clients the client IDs are discarded too, so clients cannot resume
+        and have to relogin with their cid.
+        """
+        dropped = 0
+        for session in list(self._clients.values()):
+            if session.websocket is not None:
+                session.websocket.transport.abort()
+                dropped += 1
+                if forget_clients:
+                    self._detach(session)
+        if forget_clients:
+            self._clients.clear()
+        return dropped
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    # =============================
+    #  HTTP RESERVE ENDPOINT
+    # =============================
+
+    def _process_request(self, connection, request):
+        path = urllib.parse.urlsplit(request.path).path
+        if not path.startswith("/reserve/session/"):
+            return None
+
+        pin = path[len("/reserve/session/"):].strip("/")
+        if pin != self.game_pin:
+            return connection.respond(HTTPStatus.NOT_FOUND, "Not found\n")
+
+        offset = (self._challenge_terms[0] + self._challenge_terms[1]) * (self._challenge_terms[2] + self._challenge_terms[3])
+        body = self.codec.dumps({
+            "twoFactorAuth": False,
+            "namerator": False,
+            "challenge": build_challenge(self._challenge_message, self._challenge_terms),
+        })
+        response = connection.respond(HTTPStatus.OK, body)
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "application/json"
+        response.headers["x-kahoot-session-token"] = encode_session_token(
+            self.session_token, self._challenge_message, offset
+        )
+        return response
+
+    # =============================
+    #  COMETD ENDPOINT
+    # =============================
+
+    async def _handle_connection(self, websocket) -> None:
+        expected = f"/cometd/{self.game_pin}/{urllib.parse.quote(self.session_token, safe='')}"
+        if websocket.request.path != expected:
+            await websocket.close(1008, "Invalid session token")
+            return
+
+        try:
+            async for frame in websocket:
+                received_at = time.perf_counter()
+                messages = self.codec.loads(frame)
+                if isinstance(messages, dict):
+                    messages = [messages]
+                for message in messages:
+                    await self._handle_message(websocket, message, received_at)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for session in list(self._clients.values()):
+                if session.websocket is websocket:
+                    self._detach(session)
+
+    async def _handle_message(self, websocket, message: Dict[str, Any], received_at: float) -> None:
+        channel = message.get("channel")
+        self.received.append(message)
+
+        if channel == "/meta/handshake":
+            session = _Session(websocket)
+            session.client_id = secrets.token_hex(11)
+            self._clients[session.client_id] = session
+            await self._send(session, [self._reply(message, {
+                "version": "1.0",
+                "minimumVersion": "1.0",
+                "supportedConnectionTypes": ["websocket", "long-polling", "callback-polling"],
+                "clientId": session.client_id,
+                "advice": {"reconnect": "retry", "interval": 0, "timeout": int(self.connect_timeout * 1000)},
+                "ext": {"ack": True, "timesync": self._timesync(message, received_at)},
+            })])
+
+            return
+
+        session = self._clients.get(message.get("clientId"))
+        if session is None:
+            await self._send_frame(websocket, [self._reply(message, {
+                "successful": False,
+                "error": "402::Unknown client",
+                "advice": {"reconnect": "handshake", "interval": 0},
+            })])
+            return
+
+        if session.websocket is not websocket:
+            # Known client on a new WebSocket: resume it there
+            self._attach(session, websocket)
+
+        if channel == "/meta/connect":
+            if (message.get("advice") or {}).get("timeout") == 0:
+                # Initial connect is answered straight away
+                await self._send(session, [self._connect_reply(session, message, received_at)])
+            else:
+                # Long poll: held until there is something to deliver or it times out
+                self._hold_connect(session, message, received_at)
+
+        elif channel == "/service/controller":
+            await self._handle_controller(session, message, received_at)
+
+        elif channel == "/meta/disconnect":
+            await self._send(session, [self._reply(message, {})])
+            await session.websocket.close()
+
+    async def _handle_controller(self, session: _Session, message: Dict[str, Any], received_at: float) -> None:
+        data = message.get("data") or {}
+
+        if data.get("type") == "relogin" and data.get("cid") in self._players:
+            player = self._players[data["cid"]]
+            if player is not session:
+                self._adopt(player, session)
+            await self._send(player, [
+                self._reply(message, {}),
+                {"channel": "/service/controller", "data": {"type": "loginResponse", "cid": player.cid}},
+            ])
+
+        elif data.get("type") in ("login", "relogin"):
+            session.player_name = data.get("name", "")
+            session.cid = str(random.randint(10 ** 9, 10 ** 10))
+            self._players[session.cid] = session
+            await self._send(session, [
+                self._reply(message, {}),
+                {"channel": "/service/controller", "data": {"type": "loginResponse", "cid": session.cid}},
+            ])
+
+        elif data.get("id") == 16:
+            # Client ready: acknowledge and start the scripted game
+            await self._send(session, [self._reply(message, {})])
+            if session.game_task is None:
+                session.game_task = asyncio.create_task(self._run_game(session))
+
+        elif data.get("id") == 45:
+            content = self.codec.loads(data.get("content") or "{}")
+            if session.answer is None and self.question_log:
+                entry = self.question_log[-1]
+                if entry["answer_received_at"] is None and content.get("questionIndex") == entry["index"]:
+                    entry["answer_received_at"] = received_at
+                    entry["answer"] = content
+                    session.answer = content
+                    session.answered.set()
+            await self._send(session, [self._reply(message, {})])
+
+        else:
+            await self._send(session, [self._reply(message, {})])
+
+    # =============================
+    #  SCRIPTED GAME
+    # =============================
+
+    async def _run_game(self, session: _Session) -> None:
+        # Join sequence: each event rides on its own connect poll, as on kahoot.it
+        await self._push_on_poll(session, [{"channel": "/service/status", "data": {"type": "status", "status": "ACTIVE"}}])
+        await self._push_on_poll(session, [self._player_event(14, {"playerName": session.player_name, "quizType": "quiz"})])
+        await self._push_on_poll(session, [self._player_event(9, {"quizName": "Stand-in quiz", "quizQuestionAnswers": [
+            question.number_of_choices for question in self.questions
+        ]})])
+        await asyncio.sleep(self.start_delay)
+
+        total = len(self.questions)
+        for index, question in enumerate(self.questions):
+            await asyncio.sleep(question.get_ready)
+            content = question.question_content(index, total)
+            await self._push(session, [self._player_event(1, content)])
+            await asyncio.sleep(question.prefetch_lead)
+
+            session.answer = None
+            session.answered.clear()
+            entry = {"index": index, "start_sent_at": None, "answer_received_at": None, "answer": None}
+            self.question_log.append(entry)
+
+            entry["start_sent_at"] = time.perf_counter()
+            await self._push(session, [self._player_event(2, content)])
+
+            try:
+                await asyncio.wait_for(session.answered.wait(), question.time_available / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+            result = question.result_content(index, session.answer, session.total_score)
+            session.total_score = result["totalScore"]
+            await self._push(session, [self._player_event(8, result)])
+
+    # =============================
+    #  HELPERS
+    # =============================
+
+    def _player_event(self, event_id: int, content: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "channel": "/service/player",
+            "data": {"id": event_id, "type": "message", "content": self.codec.dumps(content)},
+            "ext": {"timetrack": int(time.time() * 1000)},
+        }
+
+    def _reply(self, message: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        reply = {"id": message.get("id"), "channel": message.get("channel"), "successful": True}
+        reply.update(fields)
+        return reply
+
+    def _timesync(self, message: Dict[str, Any], received_at: float) -> Dict[str, Any]:
+        """Bayeux timesync reply: tc echoed, ts receive time, p time held before replying, a = ts - tc"""
+        client_time = ((message.get("ext") or {}).get("timesync") or {}).get("tc", 0)
+        processing = (time.perf_counter() - received_at) * 1000
+        server_time = int(time.time() * 1000 - processing)
+        return {"tc": client_time, "ts": server_time, "p": int(processing), "a": server_time - client_time}
+
+    def _connect_reply(self, session: _Session, message: Dict[str, Any], received_at: float) -> Dict[str, Any]:
+        reply = self._reply(message, {
+            "advice": {"reconnect": "retry", "interval": 0, "timeout": int(self.connect_timeout * 1000)},
+            "ext": {"ack": session.ack, "timesync": self._timesync(message, received_at)},
+        })
+        session.ack += 1
+        return reply
+
+    def _hold_connect(self, session: _Session, message: Dict[str, Any], received_at: float) -> None:
+        # A newer poll supersedes the held one without answering it
+        if session.connect_timer:
+            session.connect_timer.cancel()
+        session.pending_connect = (message, received_at)
+        session.connect_held.set()
+        session.connect_timer = asyncio.get_running_loop().call_later(
+            self.connect_timeout, lambda: asyncio.ensure_future(self._push(session, []))
+        )
+
+    async def _push(self, session: _Session, messages: List[Dict[str, Any]]) -> None:
+        """Deliver server events, completing the held connect in the same frame"""
+        if session.pending_connect:
+            message, received_at = session.pending_connect
+            session.pending_connect = None
+            session.connect_held.clear()
+            if session.connect_timer:
+                session.connect_timer.cancel()
+                session.connect_timer = None
+            messages = messages + [self._connect_reply(session, message, received_at)]
+        if messages:
+            await self._send(session, messages)
+
+    async def _push_on_poll(self, session: _Session, messages: List[Dict[str, Any]]) -> None:
+        """Wait for the client's next connect poll, then deliver with it"""
+        await session.connect_held.wait()
+        await self._push(session, messages)
+
+    async def _send(self, session: _Session, messages: List[Dict[str, Any]]) -> None:
+        """Send to the session's WebSocket, keeping the messages for later while it has none"""
+        if session.outbox:
+            messages = session.outbox + messages
+            session.outbox = []
+        if session.websocket is None or not await self._send_frame(session.websocket, messages):
+            # Connect replies belong to the lost poll, everything else is redelivered
+            session.outbox = [message for message in messages if message.get("channel") != "/meta/connect"]
+
+    async def _send_frame(self, websocket, messages: List[Dict[str, Any]]) -> bool:
+        try:
+            await websocket.send(self.codec.dumps(messages))
+            return True
+        except websockets.exceptions.ConnectionClosed:
+            return False
+
+    def _attach(self, session: _Session, websocket) -> None:
+        session.websocket = websocket
+        if session.expire_timer:
+            session.expire_timer.cancel()
+            session.expire_timer = None
+
+    def _detach(self, session: _Session) -> None:
+        """The WebSocket of a session closed: keep it resumable for session_timeout seconds"""
+        session.websocket = None
+        session.pending_connect = None
+        session.connect_held.clear()
+        if session.connect_timer:
+            session.connect_timer.cancel()
+            session.connect_timer = None
+        session.expire_timer = asyncio.get_running_loop().call_later(
+            self.session_timeout, self._expire, session
+        )
+
+    def _adopt(self, player: _Session, session: _Session) -> None:
+        """Relogin: the player's game continues on the new client's connection"""
+        self._attach(player, session.websocket)
+        player.client_id = session.client_id
+        player.ack = session.ack
+        self._clients[player.client_id] = player
+        if session.connect_timer:
+            session.connect_timer.cancel()
+        if session.pending_connect:
+            self._hold_connect(player, *session.pending_connect)
+
+    def _expire(self, session: _Session) -> None:
+        if session.websocket is not None:
+            return
+        self._cancel_session(session)
+        if self._clients.get(session.client_id) is session:
+            del self._clients[session.client_id]
+        if self._players.get(session.cid) is session:
+            del self._players[session.cid]
+
+    def _cancel_session(self, session: _Session) -> None:
+        if session.connect_timer:
+            session.connect_timer.cancel()
+        if session.expire_timer:
+            session.expire_timer.cancel()
+        if session.game_task:
+            session.game_task.cancel()
@@ -0,0 +1,3 @@
+from .StandInServer import StandInServer, ScriptedQuestion
+
+__all__ = ['StandInServer', 'ScriptedQuestion']
@@ -0,0 +1,28 @@
+"""Run the stand-in server: python -m KahootConnect.Server [--port 8080] [--questions 5]"""
+import argparse
+import asyncio
+import logging
+
+from .StandInServer import StandInServer, ScriptedQuestion
+
+async def main():
+    parser = argparse.ArgumentParser(description="Local Kahoot stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pin", default="1234567")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--time-available", type=int, default=20000, help="answer window in ms")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    questions = [ScriptedQuestion(time_available=args.time_available) for _ in range(args.questions)]
+    server = StandInServer(args.pin, questions, host=args.host, port=args.port)
+    await server.start()
+    print(f"Game PIN {args.pin}: KahootClient(..., base_url=\"{server.base_url}\")")
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
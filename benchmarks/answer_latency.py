@@ -0,0 +1,120 @@
+"""Answer-latency benchmark against the local stand-in server.
+
+Times the reaction chain for every scripted question, all on time.perf_counter():
+  start_to_dispatch   server sends start (data.id 2) -> onGameBlockUpdate dispatched
+  dispatch_to_answer  dispatch -> BlockContext.answer() entered
+  answer_to_socket    answer() entered -> bytes written on the socket
+  socket_to_server    bytes written -> server received the answer
+and prints p50/p95/p99 (milliseconds) as JSON. With --staged the answer is staged on
+the prefetch instead and GameEventHandler sends it on the start event, so only
+start_to_socket, socket_to_server and total apply.
+
+Usage: python benchmarks/answer_latency.py [--questions 200] [--type quiz] [--staged]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect import KahootClient
+from KahootConnect.Server import StandInServer, ScriptedQuestion
+
+ANSWERS = {
+    "quiz": {"choice": 1},
+    "multiple_select_quiz": {"choice": [0, 2]},
+    "slider": {"value": 50},
+    "open_ended": {"text": "answer"},
+    "jumble": {"choice": [3, 1, 0, 2]},
+}
+
+INTERVALS = ("start_to_dispatch", "dispatch_to_answer", "answer_to_socket", "start_to_socket", "socket_to_server", "total")
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(samples) -> dict:
+    summary = {}
+    for interval in INTERVALS:
+        values = [sample[interval] * 1000 for sample in samples if interval in sample]
+        if not values:
+            continue
+        summary[interval] = {
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": max(values),
+        }
+    return summary
+
+async def run(question_count: int, question_type: str, gap: float, staged: bool) -> dict:
+    questions = [
+        ScriptedQuestion(type=question_type, correct=ANSWERS[question_type].get("choice", 1),
+                         time_available=5000, get_ready=gap, prefetch_lead=gap)
+        for _ in range(question_count)
+    ]
+    contexts = {}
+
+    async with StandInServer(questions=questions) as server:
+        client = KahootClient(server.game_pin, "benchmark", base_url=server.base_url)
+
+        async def on_game_block_update(ctx):
+            if staged and ctx.status == "awaiting":
+                ctx.stage_answer(**ANSWERS[ctx.type])
+            elif ctx.status == "started":
+                if not staged:
+                    await ctx.answer(**ANSWERS[ctx.type])
+                contexts[ctx.index] = ctx
+            elif ctx.status == "ended" and ctx.index == question_count - 1:
+                await client.disconnect()
+
+        client.on_gameBlockUpdate(on_game_block_update)
+        if not await client.connect():
+            raise RuntimeError("Could not connect to the stand-in server")
+        await client.listen()
+
+        samples = []
+        for entry in server.question_log:
+            ctx = contexts.get(entry["index"])
+            if ctx is None or entry["answer_received_at"] is None or not ctx.answer_sent_at:
+                continue
+            sample = {
+                "start_to_socket": ctx.answer_sent_at - entry["start_sent_at"],
+                "socket_to_server": entry["answer_received_at"] - ctx.answer_sent_at,
+                "total": entry["answer_received_at"] - entry["start_sent_at"],
+            }
+            if not staged:
+                sample.update({
+                    "start_to_dispatch": ctx.dispatched_at - entry["start_sent_at"],
+                    "dispatch_to_answer": ctx.answer_started_at - ctx.dispatched_at,
+                    "answer_to_socket": ctx.answer_sent_at - ctx.answer_started_at,
+                })
+            samples.append(sample)
+
+    return {
+        "questions": question_count,
+        "answered": len(samples),
+        "type": question_type,
+        "staged": staged,
+        "intervals": summarize(samples),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--type", choices=sorted(ANSWERS), default="quiz")
+    parser.add_argument("--gap", type=float, default=0.005, help="seconds between script steps")
+    parser.add_argument("--staged", action="store_true", help="stage answers on the prefetch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps(asyncio.run(run(args.questions, args.type, args.gap, args.staged)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Microbenchmark of JSON encode/decode cost per packet type for every installed codec.
+
+Usage: python benchmarks/codec_benchmark.py [--number N] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect.Codec import available_codecs, get_codec
+from KahootConnect.Context import shared_context
+from KahootConnect.Packets.Messages.PacketFactory import PacketFactory
+
+QUESTION = {
+    "gameBlockIndex": 8,
+    "totalGameBlockCount": 12,
+    "layout": "TRUE_FALSE",
+    "extensiveMode": False,
+    "type": "quiz",
+    "timeRemaining": 30000,
+    "timeAvailable": 30000,
+    "numberOfAnswersAllowed": 1,
+    "currentQuestionAnswerCount": 0,
+    "numberOfChoices": 2,
+    "questionRestricted": False,
+    "getReadyTimeAvailable": 6534,
+    "getReadyTimeRemaining": 6534,
+    "nextGameBlockData": {
+        "type": "content",
+        "media": [],
+        "imageMetadata": {
+            "id": "ae716b40-76ad-40e4-8259-15cccebdb4b9",
+            "altText": "https://images-cdn.kahoot.it/ae716b40-76ad-40e4-8259-15cccebdb4b9?auto=webp",
+            "contentType": "image/jpeg",
+            "resources": "peupleloup, CC BY-SA 2.0 <https://creativecommons.org/licenses/by-sa/2.0>, via Wikimedia Commons",
+            "width": 640,
+            "height": 427,
+            "crop": {"origin": {"x": 0, "y": 0}, "target": {"x": 640, "y": 427}, "circular": False}
+        },
+        "layout": "TOP_IMAGE"
+    },
+    "questionIndex": 8,
+    "gameBlockType": "quiz",
+    "canZoomImportedSlide": False
+}
+
+RESULT = {
+    "rank": 4,
+    "totalScore": 0,
+    "pointsData": {
+        "totalPointsWithBonuses": 0,
+        "questionPoints": 0,
+        "answerStreakPoints": {"streakLevel": 0, "previousStreakLevel": 0},
+        "lastGameBlockIndex": 8
+    },
+    "nemesis": {"name": "dfghjbsdfg", "isGhost": False, "totalScore": 0},
+    "hasAnswer": True,
+    "skip": False,
+    "choice": 0,
+    "points": 0,
+    "correctChoices": [1],
+    "text": "True",
+    "type": "quiz",
+    "isCorrect": False
+}
+
+def player_event(event_id: int, content: dict) -> list:
+    return [{
+        "channel": "/service/player",
+        "data": {"id": event_id, "type": "message", "content": json.dumps(content), "cid": "1234567890"},
+        "ext": {"timetrack": 1761666387342}
+    }]
+
+def outgoing_packets() -> dict:
+    shared_context.game_pin = "1234567"
+    shared_context.client_id = "abcdef0123456789abcdef"
+    shared_context.player_name = "benchmark"
+    return {
+        "handshake": [PacketFactory.create_handshake_request()],
+        "connect": [PacketFactory.create_connect(4)],
+        "login": [PacketFactory.create_login_request()],
+        "quiz_answer": [PacketFactory.create_classic_answer(8, 1)],
+        "multiple_select_answer": [PacketFactory.create_multiple_select_answer(8, [0, 2, 3])],
+        "open_ended_answer": [PacketFactory.create_open_ended_answer(8, "An \"escaped\" answer ✓")],
+    }
+
+def incoming_frames() -> dict:
+    return {
+        "connect_ack": [{"channel": "/meta/connect", "successful": True, "ext": {"ack": 5, "timesync": {"tc": 1, "ts": 2, "p": 0, "a": 1}}}],
+        "prefetch": player_event(1, QUESTION),
+        "start": player_event(2, {"gameBlockIndex": 8}),
+        "result": player_event(8, RESULT),
+    }
+
+def measure(func, number: int) -> float:
+    """Best-of-5 cost of one call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def run(number: int) -> dict:
+    results = {}
+    outgoing = outgoing_packets()
+    incoming = incoming_frames()
+    for name in available_codecs():
+        codec = get_codec(name)
+        codec_results = {}
+        for packet_type, packet in outgoing.items():
+            codec_results[packet_type] = {"encode_us": measure(lambda: codec.dumps(packet), number)}
+        for packet_type, frame in incoming.items():
+            text = codec.dumps(frame)
+            timings = {"decode_us": measure(lambda: codec.loads(text), number)}
+            content = frame[0].get("data", {}).get("content")
+            if content is not None:
+                timings["content_decode_us"] = measure(lambda: codec.loads(content), number)
+            codec_results[packet_type] = timings
+        results[name] = codec_results
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing run")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    results = run(args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, codec_results in results.items():
+        print(f"\n{name}")
+        for packet_type, timings in codec_results.items():
+            cells = ", ".join(f"{key}={value:.2f}" for key, value in timings.items())
+            print(f"  {packet_type:<24} {cells}")
+
+if __name__ == "__main__":
+    main()
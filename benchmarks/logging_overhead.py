@@ -0,0 +1,125 @@
+"""Per-packet cost of the receive path under each log profile.
+
+Decodes a synthetic game (prefetch, start and end events plus heartbeat replies for
+every question) with WebSocketClient._decode_frame and runs every message through
+KahootClient._process_packet and the game event handlers, once per profile in
+EventLog.LOG_PROFILES. Log records go to a handler writing to os.devnull, so
+formatting is paid in full but no terminal I/O is measured. "quiet" is the cost
+with logging off; the difference to it is the logging overhead per packet. One
+untimed pass runs first to warm up.
+
+Usage: python benchmarks/logging_overhead.py [--questions 200] [--repeat 5] [--json-format] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect import KahootClient
+from KahootConnect.EventLog import LOG_PROFILES, JsonLogFormatter, set_log_profile
+
+def question_content(index: int) -> dict:
+    """A prefetch content about the size of a real quiz question"""
+    return {
+        "gameBlockIndex": index, "totalGameBlockCount": 1000, "type": "quiz", "layout": "CLASSIC",
+        "title": f"Question {index}: which of these is the capital of the country on the picture?",
+        "timeAvailable": 20000, "numberOfAnswersAllowed": 1, "numberOfChoices": 4,
+        "choices": [{"answer": f"Answer {choice} " * 4} for choice in range(4)],
+        "image": {"url": "https://images-cdn.kahoot.it/" + "0" * 36, "width": 1280, "height": 720},
+        "video": {"startTime": 0, "endTime": 0, "service": "youtube", "fullUrl": ""},
+        "pointsMultiplier": 1, "getReadyTimeRemaining": 5000, "questionIndex": index,
+    }
+
+def build_frames(question_count: int):
+    frames = []
+    message_id = 10
+    for index in range(question_count):
+        events = [
+            (1, question_content(index)),
+            (2, {"gameBlockIndex": index, "questionIndex": index}),
+            (8, {"gameBlockIndex": index, "type": "quiz", "choice": 1, "isCorrect": True, "points": 950,
+                 "totalScore": 950 * (index + 1), "rank": 1, "correctChoices": [1], "text": "Answer 1",
+                 "pointsData": {"totalPointsWithBonuses": 950 * (index + 1), "questionPoints": 950,
+                                "answerStreakPoints": {"streakLevel": index + 1, "previousStreakLevel": index}}}),
+        ]
+        for data_id, content in events:
+            message_id += 1
+            frames.append(json.dumps([{
+                "channel": "/service/player", "id": str(message_id),
+                "data": {"gameid": "0", "id": data_id, "type": "message", "host": "kahoot.it",
+                         "content": json.dumps(content)},
+                "ext": {"timetrack": 1761568243975 + message_id},
+            }]))
+            frames.append(json.dumps([{
+                "channel": "/meta/connect", "id": str(message_id), "successful": True,
+                "advice": {"interval": 0, "timeout": 30000}, "ext": {"ack": message_id},
+            }]))
+    return frames
+
+async def run_profile(profile: str, frames, repeat: int) -> float:
+    """Best seconds per message over `repeat` runs"""
+    set_log_profile(profile)
+    best = None
+    for _ in range(repeat):
+        client = KahootClient("0", "benchmark")
+
+        async def on_game_block_update(ctx):
+            pass
+
+        client.on_gameBlockUpdate(on_game_block_update)
+        websocket_client = client.websocket_client
+        messages = 0
+        started = time.perf_counter()
+        for frame in frames:
+            for packet in websocket_client._decode_frame(frame):
+                messages += 1
+                await client._process_packet(packet, messages)
+            # Let the handler tasks created for this frame run, as they would live
+            await asyncio.sleep(0)
+        elapsed = (time.perf_counter() - started) / messages
+        await client.game_event_handler.executor.shutdown()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+async def run(question_count: int, repeat: int) -> dict:
+    frames = build_frames(question_count)
+    # Untimed pass first, so imports and cold caches are not charged to the first profile
+    await run_profile("verbose", frames, 1)
+    results = {}
+    for profile in LOG_PROFILES:
+        results[profile] = {"per_packet_us": await run_profile(profile, frames, repeat) * 1e6}
+    baseline = results["quiet"]["per_packet_us"]
+    for timings in results.values():
+        timings["overhead_us"] = timings["per_packet_us"] - baseline
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per profile, the best one is reported")
+    parser.add_argument("--json-format", action="store_true", help="format records with JsonLogFormatter")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    handler = logging.StreamHandler(devnull)
+    handler.setFormatter(JsonLogFormatter() if args.json_format else
+                         logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logging.basicConfig(level=logging.DEBUG, handlers=[handler])
+
+    results = asyncio.run(run(args.questions, args.repeat))
+    devnull.close()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for profile, timings in results.items():
+        print(f"{profile:<10} {timings['per_packet_us']:8.2f} us/packet  (+{timings['overhead_us']:.2f} us logging)")
+
+if __name__ == "__main__":
+    main()
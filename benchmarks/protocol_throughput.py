@@ -0,0 +1,120 @@
+"""Messages per second through the sans-IO protocol core, with no event loop.
+
+Feeds received frames to a KahootProtocol and answers them the way the client does:
+every /meta/connect reply gets the next connect and every question start an answer.
+The frames come from a recorded session (PacketRecorder, see replay_benchmark.py) or
+from a synthetic game of connect replies and question events. "frames" times the
+whole loop (JSON decode, events and the encoded replies); "messages" starts from
+decoded messages and times the protocol state updates and events alone.
+
+Usage: python benchmarks/protocol_throughput.py [session.log] [--questions 2000] [--repeat 5] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect.Codec.JsonCodec import get_codec
+from KahootConnect.Networking.SessionReplay import read_session
+from KahootConnect.Protocol import (KahootProtocol, ParsedMessage, ConnectReply, PlayerMessage,
+                                    GAME_BLOCK_PREFETCH_ID, GAME_BLOCK_START_ID, GAME_BLOCK_END_ID)
+
+# Wall clock passed as received_ms, so the timesync maths is the same on every run
+RECEIVED_MS = 1761568244000.0
+
+def build_frames(question_count: int):
+    """A synthetic game: per question three events, each followed by a connect reply"""
+    frames = [json.dumps([{"channel": "/meta/handshake", "id": "1", "successful": True, "clientId": "benchmark",
+                           "advice": {"interval": 0, "timeout": 30000}}])]
+    message_id = 1
+    for index in range(question_count):
+        for data_id, content in ((GAME_BLOCK_PREFETCH_ID, {"gameBlockIndex": index, "type": "quiz", "numberOfChoices": 4}),
+                                 (GAME_BLOCK_START_ID, {"gameBlockIndex": index, "questionIndex": index}),
+                                 (GAME_BLOCK_END_ID, {"gameBlockIndex": index, "isCorrect": True, "points": 950})):
+            message_id += 1
+            frames.append(json.dumps([{
+                "channel": "/service/player", "id": str(message_id),
+                "data": {"gameid": "0", "id": data_id, "type": "message", "host": "kahoot.it",
+                         "content": json.dumps(content)},
+                "ext": {"timetrack": 1761568243975 + message_id},
+            }]))
+            frames.append(json.dumps([{
+                "channel": "/meta/connect", "id": str(message_id), "successful": True,
+                "advice": {"interval": 0, "timeout": 30000}, "ext": {"ack": message_id},
+            }]))
+    return frames
+
+def respond(protocol: KahootProtocol, events, outbound: list) -> None:
+    for event in events:
+        if type(event) is ConnectReply:
+            outbound.append(protocol.prepare(protocol.connect()))
+        elif type(event) is PlayerMessage and event.data_id == GAME_BLOCK_START_ID:
+            outbound.append(protocol.encode_answer("quiz", event.content.get("gameBlockIndex", 0), 1))
+
+def run_frames(frames, codec) -> tuple:
+    protocol = KahootProtocol("0", "benchmark", codec)
+    outbound = []
+    messages = 0
+    started = time.perf_counter()
+    for frame in frames:
+        events = protocol.receive_frame(frame, started, RECEIVED_MS)
+        messages += len(events)
+        respond(protocol, events, outbound)
+    return time.perf_counter() - started, messages, len(outbound)
+
+def run_messages(packets, codec) -> tuple:
+    protocol = KahootProtocol("0", "benchmark", codec)
+    receive_message = protocol.receive_message
+    started = time.perf_counter()
+    for packet in packets:
+        receive_message(ParsedMessage(packet, started, codec), RECEIVED_MS)
+    return time.perf_counter() - started, len(packets), 0
+
+def best_of(repeat: int, run, *args) -> dict:
+    best = None
+    for _ in range(repeat):
+        elapsed, messages, sent = run(*args)
+        if best is None or elapsed < best["elapsed"]:
+            best = {"elapsed": elapsed, "messages": messages, "sent": sent}
+    best["messages_per_second"] = best["messages"] / best["elapsed"] if best["elapsed"] else 0.0
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", help="session file written by PacketRecorder; synthetic game if omitted")
+    parser.add_argument("--questions", type=int, default=2000, help="questions of the synthetic game")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per mode, the best one is reported")
+    parser.add_argument("--codec", default=None, help="json, orjson or msgspec (best available by default)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    if args.path:
+        frames = [recorded.frame for recorded in read_session(args.path) if recorded.direction == "in"]
+    else:
+        frames = build_frames(args.questions)
+    codec = get_codec(args.codec)
+    packets = []
+    for frame in frames:
+        decoded = codec.loads(frame)
+        packets.extend(decoded if isinstance(decoded, list) else [decoded])
+
+    results = {
+        "codec": codec.name,
+        "frames": best_of(args.repeat, run_frames, frames, codec),
+        "messages": best_of(args.repeat, run_messages, packets, codec),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"codec: {results['codec']}, {len(frames)} frames")
+    for mode in ("frames", "messages"):
+        run = results[mode]
+        print(f"{mode:<9} {run['messages_per_second']:>12,.0f} msg/s  "
+              f"({run['elapsed'] / run['messages'] * 1e6:.2f} us/msg, {run['sent']} sent)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Replay a recorded session through the handler chain and report throughput.
+
+Record a session with KahootClient(..., record_session="session.log") or debug=True
+(packet_log.txt), then run: python benchmarks/replay_benchmark.py session.log [--repeat N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect.Networking.SessionReplay import SessionReplayer
+from KahootConnect.Packets.Handlers.GameEventHandler import GameEventHandler
+
+async def replay(path: str, repeat: int, speed):
+    runs = []
+    for _ in range(repeat):
+        handler = GameEventHandler()
+
+        async def on_game_block_update(ctx):
+            pass
+
+        handler.on_gameBlockUpdate(on_game_block_update)
+        runs.append(await SessionReplayer(path, handler, speed=speed).run())
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="session file written by PacketRecorder")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--speed", type=float, default=None, help="1.0 = recorded speed, omit for as fast as possible")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    runs = asyncio.run(replay(args.path, args.repeat, args.speed))
+    best = max(runs, key=lambda run: run["messages_per_second"])
+    print(json.dumps({"runs": len(runs), "best": best}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Decrypt time per join of TokenDecryptor over a corpus of reserve challenges.
+
+The built-in corpus has the challenge from docs/docs.md and generated challenges in
+every offset form the decryptor knows, each with a session token encrypted for it.
+Recorded challenges can be added with --corpus, a JSON list of
+{"challenge": ..., "session_token": ..., "token": ...} objects ("token", the expected
+decrypted value, is optional).
+
+Usage: python benchmarks/token_decrypt.py [--number N] [--corpus FILE] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import string
+import sys
+import timeit
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KahootConnect.Crypto.TokenDecryptor import TokenDecryptor, evaluate_expression
+from KahootConnect.Server.StandInServer import build_challenge, encode_session_token
+
+def random_message(length: int = 100) -> str:
+    return ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(length))
+
+def kahoot_challenge(message: str, terms) -> str:
+    """The live reserve script: tab-padded offset, angular no-op and _.replace key"""
+    a, b, c, d = terms
+    return (f"decode.call(this, '{message}'); function decode(message) {{var offset = (({a}\t +\t {b})\t *\t ({c}\t +\t {d})); "
+            "if(\t this\t .\t angular\t .\t isDate\t (\t offset\t ))\t console\t .\t log\t (\"Offset derived as: {\", offset, \"}\"); "
+            "return  _\t .\t replace\t ( message,/./g, function(char, position) {return String.fromCharCode((((char.charCodeAt(0)*position)+ offset ) % 77) + 48);});}")
+
+def built_in_corpus():
+    """(name, challenge, offset, message) for every offset form"""
+    corpus = []
+    terms = [random.randint(1, 99) for _ in range(6)]
+    a, b, c, d, e, f = terms
+
+    message = random_message()
+    corpus.append(("docs_example", f"var offset = ((98*87)*73*(90+86*7));function decode(e){{return e}}decode.call(this,'{message}');",
+                   evaluate_expression("((98*87)*73*(90+86*7))"), message))
+
+    message = random_message()
+    corpus.append(("(a+b)*(c+d)", build_challenge(message, terms[:4]), (a + b) * (c + d), message))
+
+    message = random_message()
+    corpus.append(("kahoot_live", kahoot_challenge(message, terms[:4]), (a + b) * (c + d), message))
+
+    message = random_message()
+    corpus.append(("((a+b)+c+(d+e))+f", f"decode.call(this, '{message}'); var offset = (({a} + {b}) + {c} + ({d} + {e})) + {f};",
+                   ((a + b) + c + (d + e)) + f, message))
+
+    message = random_message()
+    corpus.append(("((a+b)*c*(d+e))", f"decode.call(this, '{message}'); var offset = (({a} + {b}) * {c} * ({d} + {e}));",
+                   (a + b) * c * (d + e), message))
+
+    message = random_message()
+    corpus.append(("nested_expression", f"decode.call(this, '{message}'); var offset = ((({a} * {b}) + {c}) * ({d} + {e} * {f}));",
+                   ((a * b) + c) * (d + e * f), message))
+
+    entries = []
+    for name, challenge, offset, message in corpus:
+        token = secrets.token_hex(32)
+        entries.append({"name": name, "challenge": challenge,
+                        "session_token": encode_session_token(token, message, offset), "token": token})
+    return entries
+
+def load_corpus(path: str):
+    with open(path, encoding="utf-8") as corpus_file:
+        entries = json.load(corpus_file)
+    for number, entry in enumerate(entries):
+        entry.setdefault("name", f"recorded_{number}")
+    return entries
+
+def run(entries, number: int) -> dict:
+    decryptor = TokenDecryptor()
+    results = {}
+    for entry in entries:
+        decrypted = decryptor.decrypt(entry["session_token"], entry["challenge"])
+        expected = entry.get("token")
+        if expected is not None and decrypted != urllib.parse.quote(expected, safe=''):
+            raise SystemExit(f"{entry['name']}: decrypted token does not match")
+
+        decrypt = lambda: decryptor.decrypt(entry["session_token"], entry["challenge"])
+        # Best of 5, in microseconds per join
+        results[entry["name"]] = {
+            "decrypt_us": min(timeit.repeat(decrypt, number=number, repeat=5)) / number * 1e6,
+            "challenge_bytes": len(entry["challenge"]),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="decrypts per timing run")
+    parser.add_argument("--corpus", help="JSON file of recorded challenges to add")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated corpus")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    entries = built_in_corpus()
+    if args.corpus:
+        entries += load_corpus(args.corpus)
+
+    results = run(entries, args.number)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, timings in results.items():
+        print(f"{name:<24} {timings['decrypt_us']:8.2f} us  ({timings['challenge_bytes']} byte challenge)")
+
+if __name__ == "__main__":
+    main()
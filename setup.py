@@ -20,5 +20,6 @@ setuptools.setup(
     ],
     python_requires='>=3.6',
     keywords=["kahoot","bot","spam"],
-    install_requires=["websockets","httpx"],
+    install_requires=["websockets>=13","httpx"],
+    extras_require={"orjson": ["orjson"], "msgspec": ["msgspec"], "http2": ["httpx[http2]"]},
 )